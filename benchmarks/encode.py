@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+
+import timeit
+from struct import pack
+from siru.preat import Preat, Parameter
+
+COMMANDS = {
+    "gpio": (0x010, [Parameter(Parameter.Type.UINT8, 0x01)]),
+    "assert": (
+        0x005,
+        [
+            Parameter(Parameter.Type.UINT32, 100),
+            Parameter(Parameter.Type.UINT32, 5000),
+            Parameter(Parameter.Type.UINT8, 1),
+            Parameter(Parameter.Type.UINT8, 0),
+        ],
+    ),
+}
+
+
+class NullCrc:
+    def checksum(self, data: bytes) -> int:
+        return 0
+
+
+def legacy_encode(preat: Preat, method: int, parameters: list) -> bytes:
+    frame = pack(">H", 16 * method + len(parameters))
+
+    for index in range(0, len(parameters), 2):
+        if index + 1 < len(parameters):
+            block = parameters[index].encode()
+            frame = frame + parameters[index + 1].merge(block)
+        else:
+            frame = frame + parameters[index].encode()
+
+    frame = pack(">B", len(frame) + 3) + frame
+    frame = frame + pack(">H", preat.crc.checksum(frame))
+    return frame
+
+
+def rate(function, number: int = 20000) -> float:
+    return number / min(timeit.repeat(function, number=number, repeat=5))
+
+
+def compare(preat: Preat, label: str):
+    for name, (method, parameters) in COMMANDS.items():
+        assert legacy_encode(preat, method, parameters) == preat.encode(
+            method, parameters
+        )
+        legacy = rate(lambda: legacy_encode(preat, method, parameters))
+        current = rate(lambda: preat.encode(method, parameters))
+        print(
+            f"{label:8} {name:8} legacy: {legacy:10.0f} frames/s"
+            f"  current: {current:10.0f} frames/s  ({current / legacy:.2f}x)"
+        )
+
+
+def main():
+    preat = Preat("/dev/null")
+    compare(preat, "full")
+
+    # Same comparison without the CRC, to isolate the cost of building the frame
+    preat._crc = NullCrc()
+    compare(preat, "builder")
+
+
+if __name__ == "__main__":
+    main()
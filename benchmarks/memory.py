@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+
+import timeit
+import tracemalloc
+from siru.preat import Preat, Parameter
+from siru.gpio import Output
+
+COUNT = 10000
+
+
+def allocated(function, count: int = COUNT) -> float:
+    tracemalloc.start()
+    start = tracemalloc.take_snapshot()
+    retained = [function(index) for index in range(count)]
+    stop = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(item.size_diff for item in stop.compare_to(start, "filename"))
+    del retained
+    return size / count
+
+
+def rate(function, count: int = COUNT) -> float:
+    loop = lambda: [function(index) for index in range(count)]
+    return count / min(timeit.repeat(loop, number=1, repeat=5))
+
+
+def main():
+    preat = Preat("/dev/null")
+    retained = {
+        "parameter": lambda index: Parameter(Parameter.Type.UINT8, index & 0xFF),
+        "interned": lambda index: Parameter.intern(Parameter.Type.UINT8, index & 0xFF),
+        "gpio": lambda index: Output(preat, index & 0x1F, "out", "GPIO_0"),
+    }
+    for name, function in retained.items():
+        print(f"retained {name:10} {allocated(function):8.1f} bytes/object")
+
+    transient = {
+        "fresh": lambda index: preat.encode(
+            0x010, [Parameter(Parameter.Type.UINT8, index & 0x1F)]
+        ),
+        "interned": lambda index: preat.encode(
+            0x010, [Parameter.intern(Parameter.Type.UINT8, index & 0x1F)]
+        ),
+    }
+    for name, function in transient.items():
+        print(
+            f"encode   {name:10} {allocated(function):8.1f} bytes/frame"
+            f"  {rate(function):10.0f} frames/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+
+import os, sys, json, argparse, platform, subprocess, timeit
+from typing import Callable, Dict
+from siru.preat import Preat, Parameter, Decoder, Result
+from siru.crc16 import CRC16
+from siru.gpio import Output, Input
+from siru.sim import Simulator, Loopback, status_frame
+
+ASSERT = [
+    Parameter(Parameter.Type.UINT32, 100),
+    Parameter(Parameter.Type.UINT32, 5000),
+    Parameter(Parameter.Type.UINT8, 1),
+    Parameter(Parameter.Type.UINT8, 0),
+]
+GPIO = [Parameter(Parameter.Type.UINT8, 0x01)]
+REPLIES = (status_frame(Result.NO_ERROR) + status_frame(Result.METHOD_ERROR)) * 50
+
+
+def measure(function: Callable, operations: int = 1, repeat: int = 5) -> Dict:
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    seconds = min(timer.repeat(repeat=repeat, number=number)) / number
+    return {
+        "operations": operations,
+        "seconds": seconds,
+        "per_second": operations / seconds,
+        "us_per_operation": 1e6 * seconds / operations,
+    }
+
+
+def loopback(latency: float = 0.0) -> Preat:
+    simulator = Simulator(latency=latency)
+    simulator.connect(1, 3)
+    preat = Preat("loop")
+    preat.port = Loopback(simulator)
+    return preat
+
+
+def codec_benchmarks() -> Dict:
+    preat = Preat("/dev/null")
+    decoder = Decoder(CRC16)
+    frame = preat.encode(0x005, ASSERT)
+    frames = [frame, status_frame(Result.NO_ERROR)] * 5000
+
+    def decode():
+        decoder.feed(REPLIES)
+        while True:
+            reply = decoder.frame()
+            if reply == None:
+                break
+            preat.decode(reply)
+
+    return {
+        "parameter_encode": measure(lambda: ASSERT[0].encode()),
+        "preat_encode_gpio": measure(lambda: preat.encode(0x010, GPIO)),
+        "preat_encode_assert": measure(lambda: preat.encode(0x005, ASSERT)),
+        "preat_frame_cached": measure(lambda: preat.frame(0x005, ASSERT)),
+        "crc16_checksum": measure(lambda: CRC16.checksum(frame)),
+        "crc16_verify_many": measure(lambda: CRC16.verify_many(frames), len(frames)),
+        "response_decode": measure(decode, 100),
+    }
+
+
+def session_benchmarks(preat: Preat, prefix: str) -> Dict:
+    output = Output(preat, 1)
+    input = Input(preat, 3)
+    commands = [(0x010, GPIO)] * 16
+
+    def wait():
+        output.clear()
+        preat.wait(0, 1000, [input.has_rising], output.set)
+
+    return {
+        f"{prefix}_execute": measure(lambda: preat.execute(0x010, GPIO)),
+        f"{prefix}_gpio_set": measure(output.set),
+        f"{prefix}_execute_many": measure(lambda: preat.execute_many(commands), 16),
+        f"{prefix}_wait": measure(wait),
+    }
+
+
+def pty_benchmarks() -> Dict:
+    if not hasattr(os, "openpty"):
+        return {}
+    with Simulator() as simulator:
+        simulator.connect(1, 3)
+        preat = Preat(simulator.port)
+        try:
+            return session_benchmarks(preat, "pty")
+        finally:
+            preat.port.close()
+
+
+def commit() -> str:
+    try:
+        command = ["git", "rev-parse", "--short", "HEAD"]
+        return subprocess.check_output(command, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> int:
+    regressions = 0
+    for name, result in results["benchmarks"].items():
+        previous = baseline.get("benchmarks", {}).get(name)
+        if previous:
+            ratio = result["per_second"] / previous["per_second"]
+            flag = " REGRESSION" if ratio < 1 - threshold else ""
+            regressions = regressions + (1 if flag else 0)
+            print(f"{name:28} {ratio:6.2f}x{flag}")
+    return regressions
+
+
+def main(args=None) -> int:
+    parser = argparse.ArgumentParser(description="SIRU host side benchmarks")
+    parser.add_argument("-o", "--output", help="write the results as JSON")
+    parser.add_argument("-c", "--compare", help="JSON results to compare with")
+    parser.add_argument("-t", "--threshold", type=float, default=0.1)
+    parser.add_argument("--no-pty", action="store_true", help="skip pty benchmarks")
+    options = parser.parse_args(args)
+
+    benchmarks = codec_benchmarks()
+    benchmarks.update(session_benchmarks(loopback(), "loopback"))
+    if not options.no_pty:
+        benchmarks.update(pty_benchmarks())
+
+    results = {
+        "commit": commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "benchmarks": benchmarks,
+    }
+    for name, result in benchmarks.items():
+        print(
+            f"{name:28} {result['per_second']:12.0f} ops/s"
+            f" {result['us_per_operation']:10.2f} us/op"
+        )
+
+    if options.output:
+        with open(options.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if options.compare:
+        with open(options.compare) as file:
+            return 1 if compare(results, json.load(file), options.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
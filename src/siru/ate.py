@@ -30,14 +30,16 @@
 import os, glob, subprocess, yaml
 from asyncio.subprocess import PIPE
 from mako.template import Template
-from siru import gpio, preat
+from siru import gpio, preat, broker, pattern, stream
 
 
 class ATE:
+    SERVER = preat.Preat
+
     def __init__(self, **kwargs) -> None:
         self.name = kwargs.get("name", "")
         self.board = kwargs.get("board", "")
-        self._server = preat.Preat(**kwargs.get("server"))
+        self._server = self.SERVER(**kwargs.get("server"))
         self.ruwaq = ""
 
         self._digital_outputs = gpio.List(
@@ -59,6 +61,12 @@ class ATE:
     def digital_inputs(self) -> gpio.List:
         return self._digital_inputs
 
+    def pattern(self, events: list = None) -> pattern.Pattern:
+        return pattern.Pattern(self._digital_outputs, events)
+
+    def stream(self, names: list = None, **options) -> stream.Stream:
+        return stream.Stream(self._digital_inputs, names, **options)
+
     def __getattr__(self, name):
         result = getattr(self._server, name, None)
         if result == None:
@@ -69,6 +77,9 @@ class ATE:
             raise AttributeError(
                 f"{self.__class__.__name__} object has no attribute {name}"
             )
+        if isinstance(result, gpio.GPIO) or callable(result):
+            # Pins and methods don't change, later lookups skip __getattr__
+            self.__dict__[name] = result
         return result
 
     def render(self, template: str) -> str:
@@ -89,3 +100,15 @@ class ATE:
             with open(filename, "w") as file:
                 file.write(output)
         return destination
+
+
+class AsyncATE(ATE):
+    SERVER = preat.AsyncPreat
+
+
+class ThreadedATE(ATE):
+    SERVER = preat.ThreadedPreat
+
+
+class BrokerATE(ATE):
+    SERVER = broker.BrokerPreat
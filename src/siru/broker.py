@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+import os, sys, socket, select, argparse
+from threading import Thread
+from collections import deque, namedtuple
+from struct import Struct
+from typing import List, Tuple, Union
+from .preat import Preat, Result
+from .trace import Direction
+
+# Client to broker: timeout in seconds, flags and frame length, followed by the frame
+REQUEST = Struct(">fBB")
+# Broker to client: frame length followed by the frame, an empty frame is a timeout
+REPLY = Struct(">B")
+HOLD = 0x01
+
+Item = namedtuple("Item", ["client", "frame", "timeout", "flags"])
+
+
+class Broker:
+    def __init__(self, server: Union[str, Preat], path: str, **options) -> None:
+        self.server = Preat(server, **options) if isinstance(server, str) else server
+        self.path = path
+        self._listener = None
+        self._clients = {}
+        self._queue = deque()
+        self._owner = None
+        self._thread = None
+        self._running = False
+        self._wakeup = None
+
+    @property
+    def clients(self) -> int:
+        return len(self._clients)
+
+    def start(self) -> str:
+        self.listen()
+        self._running = True
+        self._thread = Thread(target=self.run, name="siru-broker", daemon=True)
+        self._thread.start()
+        return self.path
+
+    def listen(self) -> None:
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._listener.bind(self.path)
+        self._listener.listen()
+        self._wakeup = os.pipe()
+
+    def run(self) -> None:
+        while self._running:
+            sockets = [self._listener, self._wakeup[0]] + list(self._clients)
+            ready, _, _ = select.select(sockets, [], [], 0.1)
+            for item in ready:
+                if item == self._wakeup[0]:
+                    os.read(self._wakeup[0], 1024)
+                elif item == self._listener:
+                    client, _ = self._listener.accept()
+                    self._clients[client] = bytearray()
+                else:
+                    self.receive(item)
+            self.dispatch()
+
+    def serve_forever(self) -> None:
+        self.listen()
+        self._running = True
+        try:
+            self.run()
+        finally:
+            self._running = False
+            self.close()
+
+    def receive(self, client: socket.socket) -> None:
+        try:
+            data = client.recv(4096)
+        except OSError:
+            data = b""
+        if not data:
+            self.disconnect(client)
+            return
+
+        buffer = self._clients[client]
+        buffer.extend(data)
+        while len(buffer) >= REQUEST.size:
+            timeout, flags, length = REQUEST.unpack_from(buffer)
+            if len(buffer) < REQUEST.size + length:
+                break
+            frame = bytes(buffer[REQUEST.size : REQUEST.size + length])
+            del buffer[: REQUEST.size + length]
+            self._queue.append(Item(client, frame, timeout, flags))
+
+    def disconnect(self, client: socket.socket) -> None:
+        del self._clients[client]
+        self._queue = deque(item for item in self._queue if item.client != client)
+        if self._owner == client:
+            self._owner = None
+        client.close()
+
+    def next(self) -> Item:
+        index = 0
+        while index < len(self._queue):
+            item = self._queue[index]
+            if self._owner != None and item.client != self._owner:
+                index = index + 1
+                continue
+            del self._queue[index]
+            if not item.frame:
+                # Release, the requests held back from other clients are next in line
+                self._owner = None
+                index = 0
+                continue
+            if item.flags & HOLD:
+                self._owner = item.client
+            return item
+        return None
+
+    def dispatch(self) -> None:
+        inflight = deque()
+        item = self.next()
+        while item != None or inflight:
+            while item != None and len(inflight) < self.server.WINDOW:
+                self.server.transmit(item.frame)
+                inflight.append(item)
+                item = self.next()
+
+            current = inflight.popleft()
+            response = self.server.response(current.timeout)
+            self.server.decode(response)
+            self.reply(current.client, response)
+            if not response:
+                # Once a reply is lost the ones in flight can't be matched in order
+                while inflight:
+                    self.reply(inflight.popleft().client, b"")
+                self.server.discard()
+            if item == None:
+                item = self.next()
+
+    def reply(self, client: socket.socket, response: bytes) -> None:
+        try:
+            client.sendall(REPLY.pack(len(response)) + response)
+        except OSError:
+            pass
+
+    def stop(self) -> None:
+        if self._thread:
+            self._running = False
+            os.write(self._wakeup[1], b"\x00")
+            self._thread.join()
+            self._thread = None
+        self.close()
+
+    def close(self) -> None:
+        for client in list(self._clients):
+            self.disconnect(client)
+        if self._listener:
+            self._listener.close()
+            os.unlink(self.path)
+        for fd in self._wakeup or ():
+            os.close(fd)
+        self._listener = self._wakeup = None
+
+    def __enter__(self) -> "Broker":
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+
+class BrokerPreat(Preat):
+    def __init__(self, url: str, **options) -> None:
+        super().__init__(url, **options)
+        self._reader = None
+        self._holding = 0
+
+    @property
+    def port(self) -> socket.socket:
+        if self._port == None:
+            self._port = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._port.connect(self._url)
+            self._reader = self._port.makefile("rb")
+        return self._port
+
+    @port.setter
+    def port(self, value: socket.socket) -> None:
+        self._port = value
+        self._reader = value.makefile("rb") if value != None else None
+
+    def transmit(self, frame: bytes, timeout: int = 0) -> None:
+        record = self._trace.record(Direction.REQUEST, frame)
+        self._pending.append((16 * frame[1] + (frame[2] >> 4), record.timestamp))
+        flags = HOLD if self._holding else 0
+        self.port.sendall(REQUEST.pack(timeout, flags, len(frame)) + frame)
+
+    def response(self, timeout: int = 0) -> bytes:
+        self.port
+        header = self._reader.read(REPLY.size)
+        if len(header) < REPLY.size:
+            raise ConnectionError(f"Broker at {self._url} closed the connection")
+        (length,) = REPLY.unpack(header)
+        return self._reader.read(length)
+
+    def exchange(self, frame: bytes, timeout: int = 0) -> Tuple[Result, bytes]:
+        self.transmit(frame, timeout)
+        response = self.response(timeout)
+        return self.decode(response, timeout), response
+
+    def request_many(
+        self, frames: List[bytes], timeouts: List[int] = None, window: int = None
+    ) -> List[Result]:
+        frames = list(frames)
+        timeouts = timeouts or [0] * len(frames)
+        # The broker keeps its own window, everything goes out at once
+        for frame, timeout in zip(frames, timeouts):
+            self.transmit(frame, timeout)
+
+        results = []
+        for timeout in timeouts:
+            if results and results[-1] == Result.RESPONSE_TIMEOUT:
+                # Once a reply is lost the remaining ones can't be matched in order
+                self.response(timeout)
+                results.append(Result.RESPONSE_TIMEOUT)
+            else:
+                results.append(self.receive(timeout))
+        return results
+
+    def wait(
+        self, delay: int, timeout: int, inputs: List[callable], output: callable
+    ) -> Result:
+        # The broker serves only this client until the assert is complete
+        self._holding = self._holding + 1
+        try:
+            return super().wait(delay, timeout, inputs, output)
+        finally:
+            self._holding = self._holding - 1
+            if not self._holding:
+                self.port.sendall(REQUEST.pack(0, 0, 0))
+
+
+def main(args=None) -> int:
+    parser = argparse.ArgumentParser(description="Share a SIRU ATE between processes")
+    parser.add_argument("url", help="serial port of the ATE")
+    parser.add_argument("path", help="unix socket for the clients")
+    parser.add_argument("-b", "--baudrate", type=int, default=Preat.BAUDRATE)
+    options = parser.parse_args(args)
+
+    Broker(options.url, options.path, baudrate=options.baudrate).serve_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+import mmap
+from struct import Struct
+from collections import deque
+from typing import BinaryIO, Iterator, Union
+
+from .crc16 import CRC16
+from .stats import Stats
+from .trace import Direction, Record, hexdump
+
+
+MAGIC = b"SIRUCAP\x01"
+RECORD = Struct(">QBB")
+DIRECTIONS = [Direction.REQUEST, Direction.RESPONSE]
+
+
+class CaptureSink:
+    def __init__(self, file: Union[str, BinaryIO]) -> None:
+        self._owned = isinstance(file, str)
+        self.file = open(file, "ab") if self._owned else file
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+
+    def __call__(self, record: Record) -> None:
+        frame = record.frame or b""
+        direction = DIRECTIONS.index(record.direction)
+        self.file.write(RECORD.pack(record.timestamp, direction, len(frame)))
+        self.file.write(frame)
+        if record.direction == Direction.RESPONSE:
+            # A session killed while hanging keeps every completed exchange
+            self.file.flush()
+
+    def flush(self) -> None:
+        self.file.flush()
+
+    def close(self) -> None:
+        if self._owned:
+            self.file.close()
+        else:
+            self.file.flush()
+
+
+class Capture:
+    def __init__(self, path: str) -> None:
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files can't be mapped
+            self._map = b""
+        if self._map[: len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a capture file")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __iter__(self) -> Iterator[Record]:
+        return self.records()
+
+    def records(self, direction: Direction = None) -> Iterator[Record]:
+        data = self._map
+        offset = len(MAGIC)
+        while offset + RECORD.size <= len(data):
+            timestamp, index, length = RECORD.unpack_from(data, offset)
+            offset = offset + RECORD.size
+            if offset + length > len(data):
+                # Truncated by a session that didn't finish
+                break
+            if direction == None or DIRECTIONS[index] == direction:
+                frame = data[offset : offset + length]
+                yield Record(timestamp, DIRECTIONS[index], frame, None)
+            offset = offset + length
+
+    def stats(self) -> Stats:
+        from .preat import Result
+
+        stats = Stats()
+        pending = deque()
+        for record in self.records():
+            frame = record.frame
+            if record.direction == Direction.REQUEST:
+                pending.append((16 * frame[1] + (frame[2] >> 4), record.timestamp))
+            elif pending:
+                method, timestamp = pending.popleft()
+                if not frame:
+                    pending.clear()
+                    stats.record(method, None, Result.RESPONSE_TIMEOUT)
+                    continue
+                if not CRC16.verify(frame):
+                    result = Result.RESPONSE_CRC_ERROR
+                elif frame[1] == 0x00 and frame[2] >> 4 == 0x0:
+                    result = Result.NO_ERROR
+                else:
+                    result = Result(frame[4])
+                stats.record(method, record.timestamp - timestamp, result)
+        return stats
+
+    def close(self) -> None:
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+
+class Replay:
+    def __init__(self, capture: Union[str, Capture], strict: bool = True) -> None:
+        self.capture = Capture(capture) if isinstance(capture, str) else capture
+        self.strict = strict
+        self.timeout = None
+        self._records = self.capture.records()
+        self._next = next(self._records, None)
+        self._buffer = bytearray()
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self._buffer)
+
+    def advance(self) -> Record:
+        record = self._next
+        self._next = next(self._records, None)
+        return record
+
+    def write(self, data: bytes) -> int:
+        record = self._next
+        if record == None or record.direction != Direction.REQUEST:
+            raise ValueError(f"Unexpected request {hexdump(data)}")
+        if self.strict and record.frame != data:
+            raise ValueError(
+                f"Request {hexdump(data)} differs from the captured "
+                f"{hexdump(record.frame)}"
+            )
+        self.advance()
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def read(self, size: int = 1) -> bytes:
+        while len(self._buffer) < size and self._next != None:
+            if self._next.direction != Direction.RESPONSE:
+                break
+            frame = self.advance().frame
+            if not frame:
+                # The ATE didn't answer this request
+                break
+            self._buffer.extend(frame)
+
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    @property
+    def finished(self) -> bool:
+        return self._next == None and not self._buffer
+
+    def reset_input_buffer(self) -> None:
+        self._buffer.clear()
+
+    def close(self) -> None:
+        self._records.close()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+
+from typing import Iterable, List, Union
+
+try:
+    import numpy
+except ImportError:  # no cov
+    numpy = None
+
+
+class Crc16:
+    WIDTH = 16
+    POLYNOMIAL = 0xD175
+    MASK = 0xFFFF
+
+    def __init__(self, polynomial: int = POLYNOMIAL) -> None:
+        self._polynomial = polynomial
+        self._table = self.table(polynomial)
+        self._array = None
+
+    @classmethod
+    def table(cls, polynomial: int) -> List[int]:
+        result = []
+        for byte in range(256):
+            value = byte << (cls.WIDTH - 8)
+            for _ in range(8):
+                value = value << 1
+                if value & (1 << cls.WIDTH):
+                    value = value ^ polynomial
+            result.append(value & cls.MASK)
+        return result
+
+    @property
+    def polynomial(self) -> int:
+        return self._polynomial
+
+    def checksum(self, data: Union[bytes, bytearray, memoryview]) -> int:
+        table = self._table
+        value = 0x0000
+        for byte in data:
+            value = ((value << 8) & 0xFFFF) ^ table[(value >> 8) ^ byte]
+        return value
+
+    def verify(
+        self, data: Union[bytes, bytearray, memoryview], expected: int = 0
+    ) -> bool:
+        return self.checksum(data) == expected
+
+    def verify_many(self, frames: Iterable[bytes]) -> List[bool]:
+        frames = list(frames)
+        if numpy == None or not frames:
+            return [self.checksum(frame) == 0 for frame in frames]
+
+        # With a zero initial value leading zeros don't change the CRC, so
+        # frames are right aligned in a zero padded matrix and checked by column
+        lengths = numpy.fromiter(map(len, frames), dtype=numpy.intp, count=len(frames))
+        data = numpy.frombuffer(b"".join(frames), dtype=numpy.uint8)
+        ends = numpy.cumsum(lengths)
+        width = int(lengths.max())
+
+        rows = numpy.repeat(numpy.arange(len(frames)), lengths)
+        columns = numpy.arange(len(data)) + width - numpy.repeat(ends, lengths)
+        matrix = numpy.zeros((len(frames), width), dtype=numpy.uint8)
+        matrix[rows, columns] = data
+        return self.verify_matrix(matrix).tolist()
+
+    def verify_matrix(self, matrix: "numpy.ndarray") -> "numpy.ndarray":
+        if self._array is None:
+            self._array = numpy.array(self._table, dtype=numpy.uint16)
+        table = self._array
+        value = numpy.zeros(matrix.shape[0], dtype=numpy.uint16)
+        for column in matrix.T:
+            value = (value << 8) ^ table[(value >> 8) ^ column]
+        return value == 0
+
+
+CRC16 = Crc16()
@@ -32,14 +32,25 @@ import yaml
 from yamlinclude import YamlIncludeConstructor
 from pathlib import Path
 from collections import namedtuple
-from typing import Union
+from typing import Dict, List, Union
 
 from siru import gpio, ate, tasks
 
 Connection = namedtuple("Connection", ["name", "ate_pin"])
 
 
+def index_connections(connections: List[Connection]) -> Dict[str, Connection]:
+    index = {}
+    for connection in connections:
+        if connection.name in index:
+            raise ValueError(f"Duplicated connection name '{connection.name}'")
+        index[connection.name] = connection
+    return index
+
+
 class DUT:
+    ATE = ate.ATE
+
     def __init__(self, **kwargs) -> None:
         if "yaml" in kwargs:
             filename = kwargs.get("yaml")
@@ -52,7 +63,7 @@ class DUT:
             config = kwargs
 
         self.name = config.get("name", "")
-        self._ate = ate.ATE(**config.get("ate"))
+        self._ate = self.ATE(**config.get("ate"))
 
         self._digital_inputs = []
         for input in config.get("digital_inputs", []):
@@ -62,6 +73,9 @@ class DUT:
         for input in config.get("digital_outputs", []):
             self._digital_outputs.append(Connection(input["name"], input["ate_input"]))
 
+        self._inputs = index_connections(self._digital_inputs)
+        self._outputs = index_connections(self._digital_outputs)
+
         self._tasks = tasks.Tasks(**config.get("tasks"))
 
     @property
@@ -72,12 +86,12 @@ class DUT:
         return self._ate.wait(*args, **kwargs)
 
     def __get_ate_output(self, name: str) -> Union[gpio.Output, None]:
-        results = list(filter(lambda item: item.name == name, self._digital_inputs))
-        return getattr(self._ate, results[0].ate_pin, None) if len(results) else None
+        connection = self._inputs.get(name)
+        return getattr(self._ate, connection.ate_pin, None) if connection else None
 
     def __get_ate_input(self, name: str) -> Union[gpio.Input, None]:
-        results = list(filter(lambda item: item.name == name, self._digital_outputs))
-        return getattr(self._ate, results[0].ate_pin, None) if len(results) else None
+        connection = self._outputs.get(name)
+        return getattr(self._ate, connection.ate_pin, None) if connection else None
 
     def __getattr__(self, name):
         result = getattr(self._tasks, name, None)
@@ -89,4 +103,18 @@ class DUT:
             raise AttributeError(
                 f"{self.__class__.__name__} object has no attribute {name}"
             )
+        if isinstance(result, gpio.GPIO) or callable(result):
+            self.__dict__[name] = result
         return result
+
+
+class AsyncDUT(DUT):
+    ATE = ate.AsyncATE
+
+
+class ThreadedDUT(DUT):
+    ATE = ate.ThreadedATE
+
+
+class BrokerDUT(DUT):
+    ATE = ate.BrokerATE
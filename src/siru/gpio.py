@@ -27,11 +27,14 @@
 # SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
 ##################################################################################################
 
-from typing import Dict, List, Type
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Tuple, Type
 from .preat import Preat, Parameter, Result
 
 
 class GPIO:
+    __slots__ = ("_server", "_index", "_name", "_gpio_bit", "_frames", "_map")
+
     def __init__(
         self, server: Preat, index: int, name: str = "", gpio_bit: str = ""
     ) -> None:
@@ -39,6 +42,8 @@ class GPIO:
         self._index = index
         self._name = name
         self._gpio_bit = gpio_bit
+        self._frames = {}
+        self._map = None
 
     @property
     def server(self) -> Preat:
@@ -56,47 +61,53 @@ class GPIO:
     def gpio_bit(self) -> str:
         return self._gpio_bit
 
+    def frame(self, method: int) -> bytes:
+        frame = self._frames.get(method)
+        if frame == None:
+            frame = self.server.encode(
+                method, [Parameter.intern(Parameter.Type.UINT8, self.index)]
+            )
+            self._frames[method] = frame
+        return frame
+
     @property
-    def map(self) -> Dict:
-        return {
-            "name": self._name,
-            "index": self._index,
-            "gpio_bit": self._gpio_bit,
-        }
+    def map(self) -> Mapping:
+        if self._map == None:
+            # Built on first use and shared, callers get a read-only view
+            self._map = MappingProxyType(
+                {"name": self._name, "index": self._index, "gpio_bit": self._gpio_bit}
+            )
+        return self._map
 
 
 class Output(GPIO):
+    METHODS = {"set": 0x010, "clear": 0x011, "toogle": 0x012}
+
+    __slots__ = ()
+
     def set(self, *args, **kwargs) -> Result:
-        return self.server.execute(
-            0x010, [Parameter(Parameter.Type.UINT8, self.index)], *args, **kwargs
-        )
+        return self.server.request(self.frame(0x010), *args, **kwargs)
 
     def clear(self, *args, **kwargs) -> Result:
-        return self.server.execute(
-            0x011, [Parameter(Parameter.Type.UINT8, self.index)], *args, **kwargs
-        )
+        return self.server.request(self.frame(0x011), *args, **kwargs)
 
     def toogle(self, *args, **kwargs) -> Result:
-        return self.server.execute(
-            0x012, [Parameter(Parameter.Type.UINT8, self.index)], *args, **kwargs
-        )
+        return self.server.request(self.frame(0x012), *args, **kwargs)
 
 
 class Input(GPIO):
+    METHODS = {"has_rising": 0x013, "has_falling": 0x014, "has_changed": 0x015}
+
+    __slots__ = ()
+
     def has_rising(self, *args, **kwargs) -> Result:
-        return self.server.execute(
-            0x013, [Parameter(Parameter.Type.UINT8, self.index)], *args, **kwargs
-        )
+        return self.server.request(self.frame(0x013), *args, **kwargs)
 
     def has_falling(self, *args, **kwargs) -> Result:
-        return self.server.execute(
-            0x014, [Parameter(Parameter.Type.UINT8, self.index)], *args, **kwargs
-        )
+        return self.server.request(self.frame(0x014), *args, **kwargs)
 
     def has_changed(self, *args, **kwargs) -> Result:
-        return self.server.execute(
-            0x015, [Parameter(Parameter.Type.UINT8, self.index)], *args, **kwargs
-        )
+        return self.server.request(self.frame(0x015), *args, **kwargs)
 
 
 class List:
@@ -104,6 +115,7 @@ class List:
 
     def __init__(self, server: Preat, type: Type[GPIO], config: List[dict]) -> None:
         index = 0
+        self._server = server
         self._list = []
         for entry in config:
             self._list.append(
@@ -116,6 +128,16 @@ class List:
             )
             index = index + 1
 
+        self._names = {}
+        for item in self._list:
+            if item.name in self._names:
+                raise ValueError(f"Duplicated GPIO name '{item.name}'")
+            self._names[item.name] = item
+
+    @property
+    def server(self) -> Preat:
+        return self._server
+
     @property
     def list(self) -> List[GPIO]:
         return self._list
@@ -124,18 +146,42 @@ class List:
     def count(self) -> int:
         return len(self._list)
 
+    def pin(self, name: str) -> GPIO:
+        # Pin names may shadow members like read or write, they're looked up apart
+        result = self._names.get(name)
+        if result == None:
+            raise AttributeError(
+                f"'{self.__class__.__name__}' object has no pin '{name}'"
+            )
+        return result
+
+    def write(self, values: Dict[str, bool]) -> Result:
+        mask = 0
+        levels = 0
+        for name, value in values.items():
+            index = self.pin(name).index
+            mask = mask | 1 << index
+            levels = levels | (1 << index if value else 0)
+        return self._server.write_gpio(mask, levels)
+
+    def read(self, names: List[str] = None) -> Tuple[Result, Dict[str, bool]]:
+        items = self._list if names == None else [self.pin(name) for name in names]
+        return self._server.read_gpio({item.name: item.index for item in items})
+
     @property
     def init_code(self) -> str:
         result = ""
         for item in self._list:
             result = result + "\n" if result else ""
-            result = result + self.TEMPLATE_INIT_CODE.format(**item.map)
+            result = result + self.TEMPLATE_INIT_CODE.format(
+                name=item.name, index=item.index, gpio_bit=item.gpio_bit
+            )
         return result
 
     def __getattr__(self, name):
-        results = list(filter(lambda item: item.name == name, self._list))
-        if len(results) != 1:
+        result = self.__dict__.get("_names", {}).get(name)
+        if result == None:
             raise AttributeError(
                 f"'{self.__class__.__name__}' object has no attribute '{name}'"
             )
-        return results[0]
+        return result
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+
+import time
+from collections import namedtuple
+from typing import List, Tuple, Union
+from .preat import Preat, AsyncPreat, ThreadedPreat, Result
+from .broker import BrokerPreat
+from . import gpio
+
+Event = namedtuple("Event", ["time", "output", "level"])
+Timing = namedtuple("Timing", ["time", "output", "level", "sent", "result"])
+
+
+class Playback:
+    def __init__(self, timings: List[Timing]) -> None:
+        self._timings = timings
+
+    @property
+    def timings(self) -> List[Timing]:
+        return self._timings
+
+    @property
+    def errors(self) -> List[float]:
+        return [item.sent - item.time for item in self._timings]
+
+    @property
+    def max_error(self) -> float:
+        return max((abs(error) for error in self.errors), default=0.0)
+
+    @property
+    def mean_error(self) -> float:
+        errors = self.errors
+        return sum(errors) / len(errors) if errors else 0.0
+
+    @property
+    def result(self) -> Result:
+        return next(
+            (item.result for item in self._timings if item.result != Result.NO_ERROR),
+            Result.NO_ERROR,
+        )
+
+
+class Pattern:
+    SPIN = 0.002
+    LEAD = 0.005
+
+    def __init__(self, outputs: gpio.List, events: List[Tuple] = None) -> None:
+        self._outputs = outputs
+        self._events = []
+        for event in events or []:
+            self.add(*event)
+
+    @property
+    def outputs(self) -> gpio.List:
+        return self._outputs
+
+    @property
+    def events(self) -> List[Event]:
+        return sorted(self._events, key=lambda event: event.time)
+
+    @property
+    def duration(self) -> float:
+        return max((event.time for event in self._events), default=0.0)
+
+    def add(
+        self, time: float, output: Union[str, gpio.Output], level: bool
+    ) -> "Pattern":
+        if time < 0:
+            raise ValueError(f"Event time {time} is before the start of the pattern")
+        if isinstance(output, str):
+            output = self._outputs.pin(output)
+        self._events.append(Event(time, output, bool(level)))
+        return self
+
+    def pulse(
+        self,
+        time: float,
+        output: Union[str, gpio.Output],
+        width: float,
+        level: bool = True,
+    ) -> "Pattern":
+        return self.add(time, output, level).add(time + width, output, not level)
+
+    def pwm(
+        self,
+        time: float,
+        output: Union[str, gpio.Output],
+        period: float,
+        duty: float,
+        cycles: int,
+    ) -> "Pattern":
+        if not 0 < duty < 1:
+            raise ValueError(f"Duty cycle {duty} must be between 0 and 1")
+        for cycle in range(cycles):
+            self.pulse(time + cycle * period, output, period * duty)
+        return self
+
+    def schedule(self) -> List[Tuple[Event, bytes]]:
+        # Every frame is encoded before the first deadline
+        return [
+            (event, event.output.frame(0x010 if event.level else 0x011))
+            for event in self.events
+        ]
+
+    def sleep(self, deadline: float) -> None:
+        remaining = deadline - time.perf_counter()
+        if remaining > self.SPIN:
+            time.sleep(remaining - self.SPIN)
+        # The last stretch is spent polling, sleep alone overshoots by milliseconds
+        while time.perf_counter() < deadline:
+            pass
+
+    def run(self, server: Preat) -> Playback:
+        schedule = self.schedule()
+        sent = []
+        results = []
+        lost = False
+        start = time.perf_counter() + self.LEAD
+
+        for event, frame in schedule:
+            deadline = start + event.time
+            # Replies are read while there is time left before the next deadline
+            while not lost and len(results) < len(sent):
+                pending = len(sent) - len(results)
+                spare = deadline - time.perf_counter()
+                if pending < server.WINDOW and spare < server.response_timeout:
+                    break
+                lost = self.collect(server, results)
+            self.sleep(deadline)
+            server.transmit(frame)
+            # Buffered transports would otherwise hold the frame until the next read
+            server.port.flush()
+            sent.append(time.perf_counter() - start)
+
+        while not lost and len(results) < len(sent):
+            lost = self.collect(server, results)
+        if lost:
+            server.discard()
+        results.extend([Result.RESPONSE_TIMEOUT] * (len(sent) - len(results)))
+
+        return Playback(
+            [
+                Timing(event.time, event.output, event.level, offset, result)
+                for (event, _), offset, result in zip(schedule, sent, results)
+            ]
+        )
+
+    def collect(self, server: Preat, results: List[Result]) -> bool:
+        result = server.receive()
+        results.append(result)
+        # Once a reply is lost the remaining ones can't be matched in order
+        return result == Result.RESPONSE_TIMEOUT
+
+    def play(self) -> Playback:
+        server = self._outputs.server
+        # Deadlines only hold when this process owns the port
+        if isinstance(server, (AsyncPreat, BrokerPreat)):
+            raise TypeError(
+                f"Patterns can't be played through {server.__class__.__name__}"
+            )
+        if isinstance(server, ThreadedPreat) and not server.owner():
+            return server.call(self.run, server).result()
+        return self.run(server)
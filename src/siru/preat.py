@@ -27,12 +27,21 @@
 # SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
 ##################################################################################################
 
-from typing import List
+import os, asyncio, queue, threading
+from concurrent.futures import Future
+from time import monotonic
+from collections import OrderedDict, deque
+from typing import Dict, List, Tuple, Union
 from enum import Enum
-from crc import Calculator, Configuration
-from struct import pack
-from serial import Serial
+from contextlib import asynccontextmanager
+from struct import Struct, pack
+from serial import Serial, SerialException
 from serial.tools import list_ports
+from .crc16 import Crc16, CRC16
+from .trace import Trace, Direction
+from .stats import Stats
+from .capture import CaptureSink
+from . import transport
 
 
 class Result(Enum):
@@ -58,9 +67,49 @@ class Parameter:
         BLOB = 0x07
         BINARY = 0x80
 
+    FORMATS = {
+        Type.UINT8: Struct(">B"),
+        Type.UINT16: Struct(">H"),
+        Type.UINT32: Struct(">I"),
+        Type.BLOB: Struct(">B"),
+    }
+    MAX_BINARY = 0x7F
+    INTERNED = 1024
+
+    __slots__ = ("_type", "_value", "_format", "_hash")
+    _interned = {}
+
     def __init__(self, type: Type, value: any) -> None:
         self._type = type
         self._value = value
+        self._format = self.FORMATS.get(type)
+        self._hash = None
+
+    @classmethod
+    def intern(cls, type: Type, value: int) -> "Parameter":
+        # Parameters are immutable, the common ones are shared instead of allocated
+        values = cls._interned.get(type)
+        if values == None:
+            values = cls._interned.setdefault(type, {})
+        parameter = values.get(value)
+        if parameter == None:
+            parameter = cls(type, value)
+            if len(values) < cls.INTERNED:
+                values[value] = parameter
+        return parameter
+
+    def __eq__(self, other: any) -> bool:
+        if not isinstance(other, Parameter):
+            return NotImplemented
+        return self._type == other._type and self._value == other._value
+
+    def __hash__(self) -> int:
+        if self._hash == None:
+            self._hash = hash((self._type, self._value))
+        return self._hash
+
+    def __repr__(self) -> str:
+        return f"Parameter({self._type.name}, {self._value!r})"
 
     @property
     def type(self) -> Type:
@@ -70,6 +119,21 @@ class Parameter:
     def value(self) -> any:
         return self._value
 
+    @property
+    def size(self) -> int:
+        if self._type == self.Type.BINARY:
+            return len(self._value)
+        return self._format.size if self._format else 0
+
+    def pack_into(self, buffer: bytearray, offset: int) -> int:
+        if self._format != None:
+            self._format.pack_into(buffer, offset, self._value)
+            return offset + self._format.size
+        elif self._type == self.Type.BINARY:
+            buffer[offset : offset + len(self._value)] = self._value
+            return offset + len(self._value)
+        return offset
+
     def encode(self) -> bytes:
         frame = b""
         if self.type == self.Type.UINT8:
@@ -78,6 +142,10 @@ class Parameter:
             frame = pack(">BH", 16 * self.type.value, self.value)
         elif self.type == self.Type.UINT32:
             frame = pack(">BI", 16 * self.type.value, self.value)
+        elif self.type == self.Type.BLOB:
+            frame = pack(">BB", 16 * self.type.value, self.value)
+        elif self.type == self.Type.BINARY:
+            frame = pack(">B", self.type.value + len(self.value)) + bytes(self.value)
         return frame
 
     def merge(self, frame: bytes) -> bytes:
@@ -85,45 +153,330 @@ class Parameter:
         header = pack(">B", frame[0] + (new[0] >> 4))
         return header + frame[1:] + new[1:]
 
+    @classmethod
+    def decode(cls, data: bytes, count: int) -> List["Parameter"]:
+        # Integers are unpacked in place and binary values are views of data
+        data = memoryview(data)
+        parameters = []
+        offset = 0
+        while len(parameters) < count:
+            if offset >= len(data):
+                raise ValueError("Truncated parameter")
+            kind = data[offset]
+            offset = offset + 1
+            if kind & 0x80:
+                size = kind & cls.MAX_BINARY
+                if offset + size > len(data):
+                    raise ValueError("Truncated parameter")
+                parameters.append(cls(cls.Type.BINARY, data[offset : offset + size]))
+                offset = offset + size
+                continue
+            for nibble in (kind >> 4, kind & 0x0F):
+                if nibble == 0 or len(parameters) == count:
+                    continue
+                try:
+                    type = cls.Type(nibble)
+                except ValueError:
+                    raise ValueError(f"Unknown parameter type 0x{nibble:x}")
+                format = cls.FORMATS[type]
+                if offset + format.size > len(data):
+                    raise ValueError("Truncated parameter")
+                parameters.append(cls(type, format.unpack_from(data, offset)[0]))
+                offset = offset + format.size
+        if offset != len(data):
+            raise ValueError("Unexpected parameter data")
+        return parameters
+
+
+class Decoder:
+    MIN_LENGTH = 5
+    MAX_LENGTH = 64
+
+    def __init__(self, crc: Crc16) -> None:
+        self._crc = crc
+        self._buffer = bytearray()
+        self._frames = []
+        self.discarded = 0
+
+    @property
+    def needed(self) -> int:
+        if self._buffer:
+            return max(1, self._buffer[0] - len(self._buffer))
+        return 1
+
+    @property
+    def partial(self) -> bool:
+        return len(self._buffer) > 0
+
+    def feed(self, data: bytes) -> None:
+        buffer = self._buffer
+        buffer += data
+
+        while buffer:
+            length = buffer[0]
+            if length < self.MIN_LENGTH or length > self.MAX_LENGTH:
+                del buffer[0]
+                self.discarded = self.discarded + 1
+            elif len(buffer) < length:
+                start = self.search(1)
+                if start == None:
+                    break
+                del buffer[:start]
+                self.discarded = self.discarded + start
+            elif self._crc.verify(buffer[:length], 0x0000):
+                self._frames.append(bytes(buffer[:length]))
+                del buffer[:length]
+            else:
+                start = self.search(1)
+                if start != None and start < length:
+                    # Not a frame boundary, a valid frame starts inside it
+                    del buffer[:start]
+                    self.discarded = self.discarded + start
+                else:
+                    # A corrupted frame is still one reply, it fails its CRC check
+                    self._frames.append(bytes(buffer[:length]))
+                    del buffer[:length]
+
+    def search(self, start: int) -> Union[int, None]:
+        buffer = self._buffer
+        for offset in range(start, len(buffer) - self.MIN_LENGTH + 1):
+            length = buffer[offset]
+            if self.MIN_LENGTH <= length <= min(self.MAX_LENGTH, len(buffer) - offset):
+                if self._crc.verify(buffer[offset : offset + length], 0x0000):
+                    return offset
+        return None
+
+    def frame(self) -> Union[bytes, None]:
+        return self._frames.pop(0) if self._frames else None
+
+    def flush(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+    def clear(self) -> None:
+        self._buffer.clear()
+        self._frames.clear()
+
 
 class Preat:
     TIMEOUT = 1
+    WINDOW = 4
+    FRAMES = 256
+    MAX_LENGTH = 64
+    HEADER = Struct(">BH")
+    FOOTER = Struct(">H")
+    # BLOB.Update: header, id/offset pair, byte string type field and CRC
+    CHUNK = MAX_LENGTH - 10
+    MAX_BLOB = 0x10000
+    RETRIES = 3
+    RETRYABLE = (Result.CRC_ERROR, Result.RESPONSE_CRC_ERROR, Result.RESPONSE_TIMEOUT)
+    BAUDRATE = 115200
+    BULK_PINS = 32
+    WIDEST = 4
+    # Floor of the adaptive response timeout, USB adapters add a few ms of jitter
+    MIN_TIMEOUT = 0.02
+    # Repeating these leaves the ATE in the same state, Toggle must never be retried
+    # Edge queries consume the latched edge, asking twice loses it
+    IDEMPOTENT = frozenset((0x010, 0x011, 0x016, 0x017, 0x018, 0x019))
+
+    # USB location to device, shared by every ATE in the process
+    _devices = {}
 
-    def __init__(self, url: str) -> None:
+    def __init__(
+        self,
+        url: str,
+        baudrate: int = BAUDRATE,
+        baudrates: List[int] = None,
+        low_latency: bool = False,
+        read_buffer_size: int = None,
+        write_buffer_size: int = None,
+        capture: str = None,
+        adaptive: bool = False,
+        retries: int = 0,
+        **options,
+    ) -> None:
         self._type = type
         self._url = url
         self._port = None
+        self._baudrate = int(baudrate)
+        self._baudrates = sorted((int(item) for item in baudrates or []), reverse=True)
+        self._low_latency = low_latency
+        self._buffer_sizes = {"rx_size": read_buffer_size, "tx_size": write_buffer_size}
+        self._options = options
         self._crc = None
+        self._decoder = None
+        self._timeout = None
+        self._frames = OrderedDict()
+        self._buffer = bytearray(self.MAX_LENGTH)
+        self._view = memoryview(self._buffer)
+        self._trace = Trace()
+        self._stats = Stats()
+        self._pending = deque()
+        self._adaptive = adaptive
+        self._retries = retries
+        self._srtt = None
+        self._rttvar = None
+        self._rto = self.TIMEOUT
+        # Unknown until the firmware answers the first GPIO.Write or GPIO.Read
+        self._bulk = None
+        self._captures = []
+        if capture:
+            self.capture(capture)
 
     @property
-    def crc(self) -> Calculator:
+    def crc(self) -> Crc16:
         if self._crc == None:
-            self._crc = Calculator(
-                Configuration(
-                    width=16,
-                    polynomial=0xD175,
-                    init_value=0x0000,
-                    final_xor_value=0x0000,
-                    reverse_input=False,
-                    reverse_output=False,
-                ),
-                optimized=True,
-            )
+            self._crc = CRC16
         return self._crc
 
+    @property
+    def decoder(self) -> Decoder:
+        if self._decoder == None:
+            self._decoder = Decoder(self.crc)
+        return self._decoder
+
+    @property
+    def trace(self) -> Trace:
+        return self._trace
+
+    @property
+    def stats(self) -> Stats:
+        return self._stats
+
+    def capture(self, file: str) -> CaptureSink:
+        sink = CaptureSink(file)
+        self._trace.add_sink(sink)
+        self._captures.append(sink)
+        return sink
+
+    def close(self) -> None:
+        for sink in self._captures:
+            self._trace.remove_sink(sink)
+            sink.close()
+        self._captures = []
+        if self._port != None:
+            self._port.close()
+            self._port = None
+
     @property
     def port(self) -> Serial:
         if self._port == None:
-            self._port = Serial(port=self.serial_url, baudrate=115200)
+            self._port = self.open()
+            self.configure(self._port)
+            self.opened()
         return self._port
 
-    def serial_url(self) -> str:
-        location = self._url.split("//")
+    @port.setter
+    def port(self, value) -> None:
+        self._port = value
+        self._timeout = None
+
+    @property
+    def baudrate(self) -> int:
+        return self._baudrate
+
+    @baudrate.setter
+    def baudrate(self, value: int) -> None:
+        self._baudrate = int(value)
+        if self._port != None:
+            self._port.baudrate = self._baudrate
+
+    def open(self) -> Serial:
+        opener = transport.TRANSPORTS.get(transport.scheme(self._url))
+        if opener != None:
+            return opener(self._url, baudrate=self._baudrate, **self._options)
+        try:
+            return Serial(
+                port=self.serial_url(), baudrate=self._baudrate, **self._options
+            )
+        except SerialException:
+            if self.usb_location(self._url) == None:
+                raise
+            # The adapter may have been plugged elsewhere, enumerate again
+            self.forget(self._url)
+            return Serial(
+                port=self.serial_url(), baudrate=self._baudrate, **self._options
+            )
+
+    def configure(self, port: Serial) -> None:
+        if self._low_latency and hasattr(port, "set_low_latency_mode"):
+            port.set_low_latency_mode(True)
+        sizes = {key: value for key, value in self._buffer_sizes.items() if value}
+        if sizes and hasattr(port, "set_buffer_size"):
+            port.set_buffer_size(**sizes)
+
+    def opened(self) -> None:
+        if self._baudrates:
+            self.negotiate()
+
+    def baudrate_frame(self, baudrate: int) -> bytes:
+        return self.frame(0x006, [Parameter(Parameter.Type.UINT32, baudrate)])
+
+    def negotiate(self, baudrates: List[int] = None) -> int:
+        current = self._baudrate
+        for baudrate in sorted(baudrates or self._baudrates, reverse=True):
+            if baudrate <= current:
+                break
+            result = self.request(self.baudrate_frame(baudrate))
+            if result == Result.METHOD_ERROR:
+                # The firmware can't change its rate
+                break
+            elif result == Result.NO_ERROR:
+                self.baudrate = baudrate
+                self.decoder.clear()
+                if self.request(self.baudrate_frame(baudrate)) == Result.NO_ERROR:
+                    return baudrate
+                # Without the confirmation the ATE goes back to the previous rate
+                self.baudrate = current
+                self.decoder.clear()
+        return self._baudrate
+
+    @staticmethod
+    def usb_location(url: str) -> Union[str, None]:
+        location = url.split("//")
         if location[0].lower() == "usb:":
-            for port in list_ports.comports():
-                if str(port.location).startswith(location[1]):
-                    return port
-        return self._url
+            return location[1]
+        return None
+
+    @classmethod
+    def resolve(cls, urls: List[str]) -> List[str]:
+        locations = [cls.usb_location(url) for url in urls]
+        missing = [
+            location
+            for location in locations
+            if location != None and not cls.present(cls._devices.get(location))
+        ]
+        if missing:
+            # A single enumeration serves every location still unresolved
+            ports = list_ports.comports()
+            for location in missing:
+                cls._devices.pop(location, None)
+                for port in ports:
+                    if str(port.location).startswith(location):
+                        cls._devices[location] = port.device
+                        break
+        return [
+            cls._devices.get(location, url) if location != None else url
+            for url, location in zip(urls, locations)
+        ]
+
+    @classmethod
+    def forget(cls, url: str = None) -> None:
+        if url == None:
+            cls._devices.clear()
+        else:
+            cls._devices.pop(cls.usb_location(url), None)
+
+    @staticmethod
+    def present(device: str) -> bool:
+        if device == None:
+            return False
+        # Only device nodes can be checked without enumerating, COM ports can't
+        return not device.startswith("/") or os.path.exists(device)
+
+    def serial_url(self) -> str:
+        return self.resolve([self._url])[0]
 
     @property
     def url(self) -> Serial:
@@ -133,54 +486,380 @@ class Preat:
     def url(self, value) -> Serial:
         self._url = value
         self._port = None
+        self._timeout = None
+        self._pending.clear()
+        if self._decoder:
+            self._decoder.clear()
 
-    def encode(self, method: int, parameters: List[any]):
-        frame = pack(">H", 16 * method + len(parameters))
+    def encode(self, method: int, parameters: List[any]) -> bytes:
+        buffer = self._buffer
+        offset = self.HEADER.size
+        limit = self.MAX_LENGTH - self.FOOTER.size
+        count = len(parameters)
+        binary = Parameter.Type.BINARY
 
-        for index in range(0, len(parameters), 2):
-            if index + 1 < len(parameters):
-                block = parameters[index].encode()
-                frame = frame + parameters[index + 1].merge(block)
+        index = 0
+        while index < count:
+            first = parameters[index]
+            # Each field is checked before packing, the buffer has no spare room.
+            # Sizes are only looked up near the end of the frame.
+            if first.type == binary:
+                # Byte strings take a whole type field, its low bits hold the length
+                size = first.size
+                if size > Parameter.MAX_BINARY or offset + 1 + size > limit:
+                    raise ValueError(f"Frame exceeds {self.MAX_LENGTH} bytes")
+                buffer[offset] = binary.value + size
+                offset = first.pack_into(buffer, offset + 1)
+                index = index + 1
+            elif index + 1 < count and parameters[index + 1].type != binary:
+                second = parameters[index + 1]
+                end = offset + 1 + self.WIDEST + self.WIDEST
+                if end > limit and offset + 1 + first.size + second.size > limit:
+                    raise ValueError(f"Frame exceeds {self.MAX_LENGTH} bytes")
+                buffer[offset] = 16 * first.type.value + second.type.value
+                offset = second.pack_into(buffer, first.pack_into(buffer, offset + 1))
+                index = index + 2
             else:
-                frame = frame + parameters[index].encode()
+                end = offset + 1 + self.WIDEST
+                if end > limit and offset + 1 + first.size > limit:
+                    raise ValueError(f"Frame exceeds {self.MAX_LENGTH} bytes")
+                buffer[offset] = 16 * first.type.value
+                offset = first.pack_into(buffer, offset + 1)
+                index = index + 1
+
+        length = offset + self.FOOTER.size
+        self.HEADER.pack_into(buffer, 0, length, 16 * method + count)
+        self.FOOTER.pack_into(buffer, offset, self.crc.checksum(self._view[:offset]))
+        return bytes(self._view[:length])
 
-        frame = pack(">B", len(frame) + 3) + frame
-        frame = frame + pack(">H", self.crc.checksum(frame))
+    def frame(self, method: int, parameters: List[any]) -> bytes:
+        binary = Parameter.Type.BINARY
+        if any(item.type == binary for item in parameters):
+            # Payloads may be unhashable and are rarely sent twice, they aren't cached
+            return self.encode(method, parameters)
+        key = (method, *parameters)
+        frame = self._frames.get(key)
+        if frame == None:
+            frame = self.encode(method, parameters)
+            self._frames[key] = frame
+            if len(self._frames) > self.FRAMES:
+                self._frames.popitem(last=False)
+        else:
+            self._frames.move_to_end(key)
         return frame
 
-    def execute(self, method: int, parameters: List[any], timeout: int = 0) -> Result:
-        frame = self.encode(method, parameters)
-        print(f"M->S: {frame.hex(' ')}")
+    def transmit(self, frame: bytes) -> None:
+        record = self._trace.record(Direction.REQUEST, frame)
+        self._pending.append((16 * frame[1] + (frame[2] >> 4), record.timestamp))
         self.port.write(frame)
-        self.port.timeout = self.TIMEOUT + timeout
-        response = self.port.read(1)
 
+    def settimeout(self, timeout: float) -> None:
+        if self._timeout != timeout:
+            self.port.timeout = timeout
+            self._timeout = timeout
+
+    @property
+    def response_timeout(self) -> float:
+        return self._rto if self._adaptive else self.TIMEOUT
+
+    def estimate(self, latency: float) -> None:
+        # Smoothed round trip and its variation as in RFC 6298
+        if self._srtt == None:
+            self._srtt = latency
+            self._rttvar = latency / 2
+        else:
+            self._rttvar = 0.75 * self._rttvar + 0.25 * abs(self._srtt - latency)
+            self._srtt = 0.875 * self._srtt + 0.125 * latency
+        rto = self._srtt + 4 * self._rttvar
+        self._rto = min(self.TIMEOUT, max(self.MIN_TIMEOUT, rto))
+
+    def backoff(self) -> None:
+        self._rto = min(self.TIMEOUT, 2 * self._rto)
+
+    def response(self, timeout: int = 0) -> bytes:
+        deadline = monotonic() + self.response_timeout + timeout
+        frame = self.decoder.frame()
+        timeout = self.response_timeout + timeout
+
+        while frame == None:
+            self.settimeout(timeout)
+            needed = self.decoder.needed
+            data = self.port.read(max(needed, self.port.in_waiting)) or b""
+            self.decoder.feed(data)
+            frame = self.decoder.frame()
+            if len(data) < needed or monotonic() > deadline:
+                break
+            timeout = self.response_timeout
+
+        if frame == None:
+            frame = self.decoder.flush()
+        return frame
+
+    def receive(self, timeout: int = 0) -> Result:
+        return self.decode(self.response(timeout), timeout)
+
+    def decode(self, response: bytes, timeout: int = 0) -> Result:
         if response:
-            self.port.timeout = self.TIMEOUT
-            response = response + self.port.read(response[0])
             if self.crc.verify(response, 0x0000):
-                error = Result.NO_ERROR if response[2] == 0x00 else Result(response[4])
+                # STATUS.Completed may carry values, only STATUS.Error has a code
+                completed = response[1] == 0x00 and response[2] >> 4 == 0x0
+                error = Result.NO_ERROR if completed else Result(response[4])
             else:
                 error = Result.RESPONSE_CRC_ERROR
-            print(f"S->M: {response.hex(' ')} (Status: {Result(error).name})")
         else:
             error = Result.RESPONSE_TIMEOUT
-            print(f"S->M: (No response)")
 
+        record = self._trace.record(Direction.RESPONSE, response, error)
+        if self._pending:
+            method, timestamp = self._pending.popleft()
+            if error == Result.RESPONSE_TIMEOUT:
+                # Replies still in flight can't be matched to their requests
+                self._pending.clear()
+                self._stats.record(method, None, error)
+            else:
+                self._stats.record(method, record.timestamp - timestamp, error)
+                if timeout == 0:
+                    # Replies that waited for a longer timeout say nothing of the link
+                    self.estimate((record.timestamp - timestamp) / 1e9)
+        if error == Result.RESPONSE_TIMEOUT:
+            self.backoff()
         return error
 
-    def wait(
-        self, delay: int, timeout: int, inputs: List[callable], output: callable
+    def discard(self) -> None:
+        # Late replies would otherwise be taken as the answers to the next requests
+        self.decoder.clear()
+        self.port.reset_input_buffer()
+
+    def idempotent(self, frame: bytes) -> bool:
+        return 16 * frame[1] + (frame[2] >> 4) in self.IDEMPOTENT
+
+    def exchange(self, frame: bytes, timeout: int = 0) -> Tuple[Result, bytes]:
+        self.transmit(frame)
+        response = self.response(timeout)
+        return self.decode(response, timeout), response
+
+    def retry(
+        self, frame: bytes, timeout: int, reply: Tuple[Result, bytes]
+    ) -> Tuple[Result, bytes]:
+        attempts = self._retries if self.idempotent(frame) else 0
+        while attempts > 0 and reply[0] in self.RETRYABLE:
+            attempts = attempts - 1
+            # Drop what is left of the failed reply before asking again
+            self.decoder.clear()
+            reply = self.exchange(frame, timeout)
+        return reply
+
+    def request(self, frame: bytes, timeout: int = 0) -> Result:
+        return self.retry(frame, timeout, self.exchange(frame, timeout))[0]
+
+    def execute(self, method: int, parameters: List[any], timeout: int = 0) -> Result:
+        return self.request(self.frame(method, parameters), timeout)
+
+    def values(self, result: Result, response: bytes) -> List[Parameter]:
+        if result != Result.NO_ERROR:
+            return []
+        # The reply is kept alive by the views of its binary values
+        return Parameter.decode(memoryview(response)[3:-2], response[2] & 0x0F)
+
+    def query(
+        self, method: int, parameters: List[any], timeout: int = 0
+    ) -> Tuple[Result, List[Parameter]]:
+        frame = self.frame(method, parameters)
+        result, response = self.retry(frame, timeout, self.exchange(frame, timeout))
+        return result, self.values(result, response)
+
+    def request_many(
+        self, frames: List[bytes], timeouts: List[int] = None, window: int = None
+    ) -> List[Result]:
+        frames = list(frames)
+        timeouts = timeouts or [0] * len(frames)
+        window = max(1, window or self.WINDOW)
+        results = []
+        sent = 0
+
+        while len(results) < len(frames):
+            while sent < len(frames) and sent - len(results) < window:
+                self.transmit(frames[sent])
+                sent = sent + 1
+
+            result = self.receive(timeouts[len(results)])
+            if result == Result.RESPONSE_TIMEOUT:
+                # Once a reply is lost the remaining ones can't be matched in order
+                missing = len(frames) - len(results)
+                results.extend([Result.RESPONSE_TIMEOUT] * missing)
+                self.discard()
+            else:
+                results.append(result)
+
+        return results
+
+    def execute_many(self, commands: List[Tuple], window: int = None) -> List[Result]:
+        commands = list(commands)
+        frames = [self.frame(command[0], command[1]) for command in commands]
+        timeouts = [command[2] if len(command) > 2 else 0 for command in commands]
+        return self.request_many(frames, timeouts, window)
+
+    def create_blob(self, id: int, size: int) -> Result:
+        return self.execute(
+            0x002,
+            [
+                Parameter.intern(Parameter.Type.UINT8, id),
+                Parameter(Parameter.Type.UINT32, size),
+            ],
+        )
+
+    def update_blob(self, id: int, offset: int, data: bytes) -> Result:
+        return self.request(self.blob_frame(id, offset, data))
+
+    def destroy_blob(self, id: int) -> Result:
+        return self.execute(0x004, [Parameter.intern(Parameter.Type.UINT8, id)])
+
+    def blob_frame(self, id: int, offset: int, data: bytes) -> bytes:
+        return self.encode(
+            0x003,
+            [
+                Parameter.intern(Parameter.Type.UINT8, id),
+                Parameter(Parameter.Type.UINT16, offset),
+                Parameter(Parameter.Type.BINARY, data),
+            ],
+        )
+
+    def blob_chunks(self, id: int, data: bytes) -> List[Tuple]:
+        if len(data) > self.MAX_BLOB:
+            raise ValueError(f"Blob exceeds {self.MAX_BLOB} bytes")
+        data = memoryview(bytes(data))
+        return [
+            (offset, self.blob_frame(id, offset, data[offset : offset + self.CHUNK]))
+            for offset in range(0, len(data), self.CHUNK)
+        ]
+
+    def upload_blob(
+        self, id: int, data: bytes, window: int = None, retries: int = None
     ) -> Result:
-        result = self.execute(
+        result = self.create_blob(id, len(data))
+        chunks = self.blob_chunks(id, data) if result == Result.NO_ERROR else []
+        retries = self.RETRIES if retries == None else retries
+
+        while chunks:
+            results = self.request_many([frame for _, frame in chunks], window=window)
+            failed = [
+                (chunk, result)
+                for chunk, result in zip(chunks, results)
+                if result != Result.NO_ERROR
+            ]
+            if not failed:
+                return Result.NO_ERROR
+            result = failed[0][1]
+            if retries <= 0 or any(item[1] not in self.RETRYABLE for item in failed):
+                break
+            chunks = [chunk for chunk, _ in failed]
+            retries = retries - 1
+
+        return result
+
+    @staticmethod
+    def indexes(mask: int) -> List[int]:
+        return [index for index in range(mask.bit_length()) if mask >> index & 1]
+
+    def output_frames(self, mask: int, levels: int) -> List[bytes]:
+        return [
+            self.frame(
+                0x010 if levels >> index & 1 else 0x011,
+                [Parameter.intern(Parameter.Type.UINT8, index)],
+            )
+            for index in self.indexes(mask)
+        ]
+
+    def input_levels(self, indexes: List[int], results: List[Result]) -> Tuple:
+        levels = 0
+        error = Result.NO_ERROR
+        for index, result in zip(indexes, results):
+            if result == Result.NO_ERROR:
+                levels = levels | 1 << index
+            elif result != Result.TIMEOUT_ERROR and error == Result.NO_ERROR:
+                error = result
+        return error, levels
+
+    def bulk(self, mask: int) -> bool:
+        # Bulk frames carry a single uint32, higher pins go one by one
+        return self._bulk != False and mask >> self.BULK_PINS == 0
+
+    def write_gpio(self, mask: int, levels: int) -> Result:
+        if self.bulk(mask):
+            result = self.execute(
+                0x018,
+                [
+                    Parameter(Parameter.Type.UINT32, mask),
+                    Parameter(Parameter.Type.UINT32, levels),
+                ],
+            )
+            if result != Result.METHOD_ERROR:
+                self._bulk = True
+                return result
+            # Older firmware, fall back to one pipelined command per output
+            self._bulk = False
+        results = self.request_many(self.output_frames(mask, levels))
+        return next(
+            (item for item in results if item != Result.NO_ERROR), Result.NO_ERROR
+        )
+
+    def read_gpio(self, pins: Dict[str, int]) -> Tuple[Result, Dict[str, bool]]:
+        mask = sum(1 << index for index in pins.values())
+        result = Result.METHOD_ERROR
+        if self.bulk(mask):
+            result, values = self.query(0x019, [])
+            self._bulk = result != Result.METHOD_ERROR
+            levels = values[0].value if values else 0
+        if result == Result.METHOD_ERROR:
+            indexes = self.indexes(mask)
+            frames = [
+                self.frame(0x016, [Parameter.intern(Parameter.Type.UINT8, index)])
+                for index in indexes
+            ]
+            result, levels = self.input_levels(indexes, self.request_many(frames))
+        return result, {name: bool(levels >> index & 1) for name, index in pins.items()}
+
+    def assert_frame(self, delay: int, timeout: int, conditions: int) -> bytes:
+        return self.frame(
             0x005,
             [
-                Parameter(Parameter.Type.UINT32, delay),
-                Parameter(Parameter.Type.UINT32, timeout),
-                Parameter(Parameter.Type.UINT8, len(inputs)),
-                Parameter(Parameter.Type.UINT8, 0x00),
+                Parameter.intern(Parameter.Type.UINT32, delay),
+                Parameter.intern(Parameter.Type.UINT32, timeout),
+                Parameter.intern(Parameter.Type.UINT8, conditions),
+                Parameter.intern(Parameter.Type.UINT8, 0x00),
             ],
         )
+
+    def action_frame(self, action: callable) -> Union[bytes, None]:
+        # Bound GPIO methods of this board know their frame, anything else is called
+        owner = getattr(action, "__self__", None)
+        if getattr(owner, "server", None) is not self:
+            return None
+        method = getattr(owner, "METHODS", {}).get(getattr(action, "__name__", None))
+        return owner.frame(method) if method != None else None
+
+    def burst(
+        self, delay: int, timeout: int, inputs: List[callable], output: callable
+    ) -> Union[List[bytes], None]:
+        frames = [self.action_frame(action) for action in list(inputs) + [output]]
+        if None in frames:
+            return None
+        return [self.assert_frame(delay, timeout, len(inputs))] + frames
+
+    def wait(
+        self, delay: int, timeout: int, inputs: List[callable], output: callable
+    ) -> Result:
+        frames = self.burst(delay, timeout, inputs, output)
+        if frames != None:
+            # The timing window is already running, don't wait for each ACK. Unlike
+            # the sequential path the trigger goes out even if the assert is rejected.
+            timeouts = [0] * (len(frames) - 1) + [timeout / 1000]
+            results = self.request_many(frames, timeouts, len(frames))
+            return next(
+                (item for item in results if item != Result.NO_ERROR), results[-1]
+            )
+
+        result = self.request(self.assert_frame(delay, timeout, len(inputs)))
         if result == Result.NO_ERROR:
             for method in inputs:
                 result = method()
@@ -191,3 +870,423 @@ class Preat:
             result = output(timeout=timeout / 1000)
 
         return result
+
+
+class ThreadedPreat(Preat):
+    BATCH = 32
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._queue = queue.SimpleQueue()
+        self._session = threading.RLock()
+        self._encoding = threading.RLock()
+        self._thread = None
+
+    def session(self) -> threading.RLock:
+        return self._session
+
+    def owner(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    def start(self) -> None:
+        with self._session:
+            if self._thread == None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self.run, name=f"preat {self._url}", daemon=True
+                )
+                self._thread.start()
+
+    def stop(self) -> None:
+        with self._session:
+            thread = self._thread
+            if thread != None:
+                self._queue.put(None)
+        if thread != None:
+            thread.join()
+            self._thread = None
+
+    def close(self) -> None:
+        self.stop()
+        super().close()
+
+    def run(self) -> None:
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            # Everything already queued goes out back to back in a single pipeline
+            while batch[-1] != None and len(batch) < self.BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if batch[-1] == None:
+                running = False
+                batch.pop()
+
+            batch = [item for item in batch if item[4].set_running_or_notify_cancel()]
+            while batch:
+                if callable(batch[0][0]):
+                    self.perform(batch.pop(0))
+                    continue
+                # A frame that may be retried goes alone, its retry can't pass later frames
+                size = 1
+                while (
+                    size < len(batch)
+                    and not batch[0][3]
+                    and not callable(batch[size][0])
+                    and not batch[size][3]
+                ):
+                    size = size + 1
+                batch[:size] = self.pipeline(batch[:size])
+
+    def perform(self, item: Tuple) -> None:
+        function, args, _, _, future = item
+        try:
+            future.set_result(function(*args))
+        except BaseException as error:
+            future.set_exception(error)
+
+    def pipeline(self, items: List[Tuple]) -> List[Tuple]:
+        frames, timeouts, windows, retries, futures = zip(*items)
+        window = max(1, min(windows))
+        results = []
+        sent = 0
+        try:
+            while len(results) < len(frames):
+                while sent < len(frames) and sent - len(results) < window:
+                    self.transmit(frames[sent])
+                    sent = sent + 1
+                result = self.receive(timeouts[len(results)])
+                results.append(result)
+                if result == Result.RESPONSE_TIMEOUT:
+                    # Replies in flight can't be matched, the frames not sent yet can
+                    results.extend([Result.RESPONSE_TIMEOUT] * (sent - len(results)))
+                    self.discard()
+                    break
+            if retries[0]:
+                reply = (results[0], b"")
+                results[0] = self.retry(frames[0], timeouts[0], reply)[0]
+        except BaseException as error:
+            for future in futures:
+                future.set_exception(error)
+            return []
+        for future, result in zip(futures, results):
+            future.set_result(result)
+        return list(items[len(results) :])
+
+    def submit(
+        self, frame: bytes, timeout: int = 0, window: int = None, retry: bool = False
+    ) -> Future:
+        future = Future()
+        with self._session:
+            self.start()
+            self._queue.put((frame, timeout, window or self.WINDOW, retry, future))
+        return future
+
+    def call(self, function: callable, *args) -> Future:
+        future = Future()
+        with self._session:
+            self.start()
+            self._queue.put((function, args, None, None, future))
+        return future
+
+    def encode(self, method: int, parameters: List[any]) -> bytes:
+        with self._encoding:
+            return super().encode(method, parameters)
+
+    def frame(self, method: int, parameters: List[any]) -> bytes:
+        with self._encoding:
+            return super().frame(method, parameters)
+
+    def request(self, frame: bytes, timeout: int = 0) -> Result:
+        if self.owner():
+            return super().request(frame, timeout)
+        return self.submit(frame, timeout, retry=True).result()
+
+    def request_many(
+        self, frames: List[bytes], timeouts: List[int] = None, window: int = None
+    ) -> List[Result]:
+        if self.owner():
+            return super().request_many(frames, timeouts, window)
+        frames = list(frames)
+        timeouts = timeouts or [0] * len(frames)
+        with self._session:
+            futures = [
+                self.submit(frame, timeout, window)
+                for frame, timeout in zip(frames, timeouts)
+            ]
+        return [future.result() for future in futures]
+
+    def query(
+        self, method: int, parameters: List[any], timeout: int = 0
+    ) -> Tuple[Result, List[Parameter]]:
+        if self.owner():
+            return super().query(method, parameters, timeout)
+        return self.call(Preat.query, self, method, parameters, timeout).result()
+
+    def wait(
+        self, delay: int, timeout: int, inputs: List[callable], output: callable
+    ) -> Result:
+        # Keep other threads from queuing requests between the assert and its conditions
+        with self._session:
+            return super().wait(delay, timeout, inputs, output)
+
+
+class AsyncPreat(Preat):
+    POLLING = 0.001
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._lock = None
+        self._owner = None
+        self._negotiated = False
+
+    @asynccontextmanager
+    async def session(self):
+        task = asyncio.current_task()
+        if self._owner is task:
+            yield self
+            return
+
+        if self._lock == None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            self._owner = task
+            try:
+                if self._baudrates and not self._negotiated:
+                    # Opening the port inside negotiate() marks it pending again
+                    await self.negotiate()
+                    self._negotiated = True
+                yield self
+            finally:
+                self._owner = None
+
+    def fileno(self) -> int:
+        try:
+            return self.port.fileno()
+        except (AttributeError, SerialException):
+            return None
+
+    async def readable(self, delay: float) -> None:
+        loop = asyncio.get_event_loop()
+        fileno = self.fileno()
+        if fileno != None:
+            event = asyncio.Event()
+            try:
+                loop.add_reader(fileno, event.set)
+            except NotImplementedError:
+                fileno = None
+        if fileno == None:
+            await asyncio.sleep(min(self.POLLING, delay))
+            return
+
+        try:
+            await asyncio.wait_for(event.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            loop.remove_reader(fileno)
+
+    async def response(self, timeout: int = 0) -> bytes:
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + self.response_timeout + timeout
+        frame = self.decoder.frame()
+        self.settimeout(0)
+
+        while frame == None:
+            needed = self.decoder.needed
+            data = self.port.read(max(needed, self.port.in_waiting)) or b""
+            if data:
+                self.decoder.feed(data)
+                frame = self.decoder.frame()
+                deadline = max(deadline, loop.time() + self.response_timeout)
+            delay = deadline - loop.time()
+            if frame != None or delay <= 0:
+                break
+            await self.readable(delay)
+
+        if frame == None:
+            frame = self.decoder.flush()
+        return frame
+
+    async def receive(self, timeout: int = 0) -> Result:
+        return self.decode(await self.response(timeout), timeout)
+
+    def opened(self) -> None:
+        # Rate negotiation needs the event loop, the next session runs it
+        self._negotiated = False
+
+    async def negotiate(self, baudrates: List[int] = None) -> int:
+        async with self.session():
+            current = self._baudrate
+            for baudrate in sorted(baudrates or self._baudrates, reverse=True):
+                if baudrate <= current:
+                    break
+                result = await self.request(self.baudrate_frame(baudrate))
+                if result == Result.METHOD_ERROR:
+                    break
+                elif result == Result.NO_ERROR:
+                    self.baudrate = baudrate
+                    self.decoder.clear()
+                    if await self.request(self.baudrate_frame(baudrate)) == (
+                        Result.NO_ERROR
+                    ):
+                        return baudrate
+                    self.baudrate = current
+                    self.decoder.clear()
+        return self._baudrate
+
+    async def exchange(self, frame: bytes, timeout: int = 0) -> Tuple[Result, bytes]:
+        self.transmit(frame)
+        response = await self.response(timeout)
+        return self.decode(response, timeout), response
+
+    async def retry(
+        self, frame: bytes, timeout: int, reply: Tuple[Result, bytes]
+    ) -> Tuple[Result, bytes]:
+        attempts = self._retries if self.idempotent(frame) else 0
+        while attempts > 0 and reply[0] in self.RETRYABLE:
+            attempts = attempts - 1
+            self.decoder.clear()
+            reply = await self.exchange(frame, timeout)
+        return reply
+
+    async def request(self, frame: bytes, timeout: int = 0) -> Result:
+        async with self.session():
+            reply = await self.exchange(frame, timeout)
+            return (await self.retry(frame, timeout, reply))[0]
+
+    async def query(
+        self, method: int, parameters: List[any], timeout: int = 0
+    ) -> Tuple[Result, List[Parameter]]:
+        frame = self.frame(method, parameters)
+        async with self.session():
+            reply = await self.exchange(frame, timeout)
+            result, response = await self.retry(frame, timeout, reply)
+        return result, self.values(result, response)
+
+    async def execute(
+        self, method: int, parameters: List[any], timeout: int = 0
+    ) -> Result:
+        return await self.request(self.frame(method, parameters), timeout)
+
+    async def request_many(
+        self, frames: List[bytes], timeouts: List[int] = None, window: int = None
+    ) -> List[Result]:
+        frames = list(frames)
+        timeouts = timeouts or [0] * len(frames)
+        window = max(1, window or self.WINDOW)
+        results = []
+        sent = 0
+
+        async with self.session():
+            while len(results) < len(frames):
+                while sent < len(frames) and sent - len(results) < window:
+                    self.transmit(frames[sent])
+                    sent = sent + 1
+
+                result = await self.receive(timeouts[len(results)])
+                if result == Result.RESPONSE_TIMEOUT:
+                    missing = len(frames) - len(results)
+                    results.extend([Result.RESPONSE_TIMEOUT] * missing)
+                    self.discard()
+                else:
+                    results.append(result)
+
+        return results
+
+    async def execute_many(
+        self, commands: List[Tuple], window: int = None
+    ) -> List[Result]:
+        commands = list(commands)
+        frames = [self.frame(command[0], command[1]) for command in commands]
+        timeouts = [command[2] if len(command) > 2 else 0 for command in commands]
+        return await self.request_many(frames, timeouts, window)
+
+    async def upload_blob(
+        self, id: int, data: bytes, window: int = None, retries: int = None
+    ) -> Result:
+        async with self.session():
+            result = await self.create_blob(id, len(data))
+            chunks = self.blob_chunks(id, data) if result == Result.NO_ERROR else []
+            retries = self.RETRIES if retries == None else retries
+
+            while chunks:
+                frames = [frame for _, frame in chunks]
+                results = await self.request_many(frames, window=window)
+                failed = [
+                    (chunk, result)
+                    for chunk, result in zip(chunks, results)
+                    if result != Result.NO_ERROR
+                ]
+                if not failed:
+                    return Result.NO_ERROR
+                result = failed[0][1]
+                if retries <= 0 or any(
+                    item[1] not in self.RETRYABLE for item in failed
+                ):
+                    break
+                chunks = [chunk for chunk, _ in failed]
+                retries = retries - 1
+
+        return result
+
+    async def write_gpio(self, mask: int, levels: int) -> Result:
+        if self.bulk(mask):
+            result = await self.execute(
+                0x018,
+                [
+                    Parameter(Parameter.Type.UINT32, mask),
+                    Parameter(Parameter.Type.UINT32, levels),
+                ],
+            )
+            if result != Result.METHOD_ERROR:
+                self._bulk = True
+                return result
+            self._bulk = False
+        results = await self.request_many(self.output_frames(mask, levels))
+        return next(
+            (item for item in results if item != Result.NO_ERROR), Result.NO_ERROR
+        )
+
+    async def read_gpio(self, pins: Dict[str, int]) -> Tuple[Result, Dict[str, bool]]:
+        mask = sum(1 << index for index in pins.values())
+        result = Result.METHOD_ERROR
+        if self.bulk(mask):
+            result, values = await self.query(0x019, [])
+            self._bulk = result != Result.METHOD_ERROR
+            levels = values[0].value if values else 0
+        if result == Result.METHOD_ERROR:
+            indexes = self.indexes(mask)
+            frames = [
+                self.frame(0x016, [Parameter.intern(Parameter.Type.UINT8, index)])
+                for index in indexes
+            ]
+            results = await self.request_many(frames)
+            result, levels = self.input_levels(indexes, results)
+        return result, {name: bool(levels >> index & 1) for name, index in pins.items()}
+
+    async def wait(
+        self, delay: int, timeout: int, inputs: List[callable], output: callable
+    ) -> Result:
+        frames = self.burst(delay, timeout, inputs, output)
+        if frames != None:
+            timeouts = [0] * (len(frames) - 1) + [timeout / 1000]
+            results = await self.request_many(frames, timeouts, len(frames))
+            return next(
+                (item for item in results if item != Result.NO_ERROR), results[-1]
+            )
+
+        async with self.session():
+            frame = self.assert_frame(delay, timeout, len(inputs))
+            result = await self.request(frame)
+            if result == Result.NO_ERROR:
+                for method in inputs:
+                    result = await method()
+                    if result != Result.NO_ERROR:
+                        break
+
+            if result == Result.NO_ERROR:
+                result = await output(timeout=timeout / 1000)
+
+        return result
@@ -0,0 +1,503 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+
+import os, tty, heapq, random, select, socket
+from threading import Thread, RLock, get_ident
+from time import monotonic, sleep
+from struct import pack
+from typing import Callable, Dict, List, Union
+from .crc16 import CRC16
+from .preat import Decoder, Parameter, Preat, Result
+from . import transport
+
+
+def parse_parameters(data: bytes, count: int) -> List[any]:
+    return [
+        bytes(parameter.value)
+        if parameter.type == Parameter.Type.BINARY
+        else parameter.value
+        for parameter in Parameter.decode(data, count)
+    ]
+
+
+def status_frame(result: Result, parameters: List[Parameter] = None) -> bytes:
+    if result == Result.NO_ERROR:
+        # Built without a shared buffer, simulators reply from their own threads
+        parameters = parameters or []
+        body = b""
+        index = 0
+        while index < len(parameters):
+            first = parameters[index]
+            second = parameters[index + 1] if index + 1 < len(parameters) else None
+            binary = Parameter.Type.BINARY
+            if first.type != binary and second != None and second.type != binary:
+                body = body + second.merge(first.encode())
+                index = index + 2
+            else:
+                body = body + first.encode()
+                index = index + 1
+        frame = pack(">BH", 5 + len(body), len(parameters)) + body
+    else:
+        frame = pack(">BHBB", 7, 16 * 0x001 + 1, 0x10, result.value)
+    return frame + pack(">H", CRC16.checksum(frame))
+
+
+class Assert:
+    def __init__(self, min: int, max: int, conditions: int, operator: int) -> None:
+        self.min = min
+        self.max = max
+        self.count = conditions
+        self.operator = operator
+        self.conditions = []
+        self.start = None
+
+    @property
+    def armed(self) -> bool:
+        return len(self.conditions) >= self.count
+
+
+class Simulator:
+    OUTPUTS = 16
+    INPUTS = 16
+
+    def __init__(
+        self,
+        outputs: int = OUTPUTS,
+        inputs: int = INPUTS,
+        latency: float = 0.0,
+        drop_rate: float = 0.0,
+        corrupt_rate: float = 0.0,
+        noise_rate: float = 0.0,
+        seed: int = None,
+        baudrates: List[int] = None,
+    ) -> None:
+        self.outputs = [False] * outputs
+        self.inputs = [False] * inputs
+        self.blobs = {}
+        self.latency = latency
+        self.drop_rate = drop_rate
+        self.corrupt_rate = corrupt_rate
+        self.noise_rate = noise_rate
+        self.received = []
+        self.baudrate = 115200
+        self.baudrates = baudrates
+
+        self._random = random.Random(seed)
+        self._decoder = Decoder(CRC16)
+        self._events = []
+        self._sequence = 0
+        self._latched = [set() for _ in range(inputs)]
+        self._wires = {}
+        self._assert = None
+        self._sink = None
+        self._lock = RLock()
+        self._thread = None
+        self._running = False
+        self._master = None
+        self._slave = None
+        self._wakeup = None
+        self._port = None
+        self._listener = None
+        self._connection = None
+
+        self._methods = {
+            0x002: self.blob_create,
+            0x003: self.blob_update,
+            0x004: self.blob_destroy,
+            0x005: self.test_assert,
+            0x010: self.gpio_set,
+            0x011: self.gpio_clear,
+            0x012: self.gpio_toggle,
+            0x013: self.gpio_has_rising,
+            0x014: self.gpio_has_falling,
+            0x015: self.gpio_has_changed,
+            0x016: self.gpio_is_set,
+            0x017: self.gpio_is_clear,
+            0x018: self.gpio_write,
+            0x019: self.gpio_read,
+        }
+        if baudrates:
+            self._methods[0x006] = self.link_baudrate
+
+    @property
+    def port(self) -> Union[str, None]:
+        return self._port
+
+    @property
+    def sink(self) -> Union[Callable[[bytes], None], None]:
+        return self._sink
+
+    @sink.setter
+    def sink(self, value: Callable[[bytes], None]) -> None:
+        self._sink = value
+
+    # Scheduler -----------------------------------------------------------------------
+
+    def schedule(self, delay: float, action: Callable[[], None]) -> None:
+        with self._lock:
+            self._sequence = self._sequence + 1
+            heapq.heappush(self._events, (monotonic() + delay, self._sequence, action))
+        self.wakeup()
+
+    def next_event(self) -> Union[float, None]:
+        with self._lock:
+            return self._events[0][0] if self._events else None
+
+    def poll(self, now: float = None) -> None:
+        with self._lock:
+            now = monotonic() if now == None else now
+            while self._events and self._events[0][0] <= now:
+                _, _, action = heapq.heappop(self._events)
+                action()
+
+    # Host side -----------------------------------------------------------------------
+
+    def receive(self, data: bytes) -> None:
+        with self._lock:
+            self._decoder.feed(data)
+            frame = self._decoder.frame()
+            while frame != None:
+                if CRC16.verify(frame, 0x0000):
+                    self.handle(frame)
+                frame = self._decoder.frame()
+
+    def reply(
+        self, result: Result, delay: float = None, values: List[Parameter] = None
+    ) -> None:
+        frame = status_frame(result, values)
+        delay = self.latency if delay == None else delay
+        if self._random.random() < self.drop_rate:
+            return
+        if self._random.random() < self.corrupt_rate:
+            frame = frame[:-1] + bytes([frame[-1] ^ 0xFF])
+        if self._random.random() < self.noise_rate:
+            frame = bytes([self._random.randrange(256)]) + frame
+        if delay > 0:
+            self.schedule(delay, lambda: self.send(frame))
+        else:
+            self.send(frame)
+
+    def send(self, frame: bytes) -> None:
+        if self._sink:
+            self._sink(frame)
+
+    def handle(self, frame: bytes) -> None:
+        self.received.append(frame)
+        method = 16 * frame[1] + (frame[2] >> 4)
+        handler = self._methods.get(method)
+        if handler == None:
+            return self.reply(Result.METHOD_ERROR)
+        try:
+            parameters = parse_parameters(frame[3:-2], frame[2] & 0x0F)
+            result = handler(*parameters)
+        except (ValueError, TypeError, IndexError, KeyError):
+            result = Result.PARAMETERS_ERROR
+        if isinstance(result, list):
+            self.reply(Result.NO_ERROR, values=result)
+        elif result != None:
+            self.reply(result)
+
+    # Device side ---------------------------------------------------------------------
+
+    def connect(self, output: int, input: int, delay: float = 0, invert=False) -> None:
+        self._wires.setdefault(output, []).append((input, delay, invert))
+
+    def set_input(self, index: int, level: bool, delay: float = 0) -> None:
+        if delay > 0:
+            self.schedule(delay, lambda: self.set_input(index, level))
+            return
+        with self._lock:
+            level = bool(level)
+            if self.inputs[index] != level:
+                self.inputs[index] = level
+                self._latched[index].add("rising" if level else "falling")
+                self.evaluate(index, level)
+
+    def drive(self, index: int, level: bool) -> None:
+        if self.outputs[index] != level:
+            self.outputs[index] = level
+            for input, delay, invert in self._wires.get(index, []):
+                self.set_input(input, level != invert, delay)
+
+    def output(self, index: int, level: bool) -> Result:
+        return self.apply({index: level})
+
+    def apply(self, levels: Dict[int, bool]) -> Result:
+        if any(index >= len(self.outputs) for index in levels):
+            return Result.PARAMETERS_ERROR
+        if self._assert and self._assert.armed:
+            check = self._assert
+            check.start = monotonic()
+            for index, level in levels.items():
+                self.drive(index, level)
+            self.schedule(check.max / 1000, lambda: self.expire(check))
+            if self._assert is check:
+                self.evaluate(None, None)
+            return None
+        for index, level in levels.items():
+            self.drive(index, level)
+        return Result.NO_ERROR
+
+    def condition(self, kind: str, index: int) -> Union[Result, None]:
+        if index >= len(self.inputs):
+            return Result.PARAMETERS_ERROR
+        if self._assert and not self._assert.armed:
+            self._assert.conditions.append([kind, index, False])
+            return Result.NO_ERROR
+
+        latched = self._latched[index]
+        if kind == "set":
+            matched = self.inputs[index]
+        elif kind == "clear":
+            matched = not self.inputs[index]
+        elif kind == "changed":
+            matched = bool(latched)
+        else:
+            matched = kind in latched
+        latched.clear()
+        return Result.NO_ERROR if matched else Result.TIMEOUT_ERROR
+
+    def evaluate(self, index: Union[int, None], level: Union[bool, None]) -> None:
+        check = self._assert
+        if check == None or check.start == None:
+            return
+        for condition in check.conditions:
+            kind, input, _ = condition
+            if kind == "set":
+                condition[2] = self.inputs[input]
+            elif kind == "clear":
+                condition[2] = not self.inputs[input]
+            elif input == index:
+                if kind == "changed" or (kind == "rising") == level:
+                    condition[2] = True
+
+        states = [condition[2] for condition in check.conditions]
+        if all(states) if check.operator == 0 else any(states):
+            elapsed = (monotonic() - check.start) * 1000
+            self._assert = None
+            self.reply(
+                Result.TOO_EARLY_ERROR if elapsed < check.min else Result.NO_ERROR
+            )
+
+    def expire(self, check: Assert) -> None:
+        if self._assert is check:
+            self._assert = None
+            self.reply(Result.TIMEOUT_ERROR)
+
+    # Methods -------------------------------------------------------------------------
+
+    def blob_create(self, id: int, size: int) -> Result:
+        if id in self.blobs:
+            return Result.REDEFINED_ERROR
+        self.blobs[id] = bytearray(size)
+        return Result.NO_ERROR
+
+    def blob_update(self, id: int, offset: int, data: bytes) -> Result:
+        blob = self.blobs.get(id)
+        if blob == None:
+            return Result.UNDEFINED_ERROR
+        if offset + len(data) > len(blob):
+            return Result.PARAMETERS_ERROR
+        blob[offset : offset + len(data)] = data
+        return Result.NO_ERROR
+
+    def blob_destroy(self, id: int) -> Result:
+        if self.blobs.pop(id, None) == None:
+            return Result.UNDEFINED_ERROR
+        return Result.NO_ERROR
+
+    def test_assert(self, min: int, max: int, conditions: int, operator: int) -> Result:
+        self._assert = Assert(min, max, conditions, operator)
+        return Result.NO_ERROR
+
+    def link_baudrate(self, baudrate: int) -> Result:
+        if baudrate not in self.baudrates:
+            return Result.PARAMETERS_ERROR
+        self.baudrate = baudrate
+        return Result.NO_ERROR
+
+    def gpio_set(self, index: int) -> Result:
+        return self.output(index, True)
+
+    def gpio_clear(self, index: int) -> Result:
+        return self.output(index, False)
+
+    def gpio_toggle(self, index: int) -> Result:
+        if index >= len(self.outputs):
+            return Result.PARAMETERS_ERROR
+        return self.output(index, not self.outputs[index])
+
+    def gpio_has_rising(self, index: int) -> Result:
+        return self.condition("rising", index)
+
+    def gpio_has_falling(self, index: int) -> Result:
+        return self.condition("falling", index)
+
+    def gpio_has_changed(self, index: int) -> Result:
+        return self.condition("changed", index)
+
+    def gpio_is_set(self, index: int) -> Result:
+        return self.condition("set", index)
+
+    def gpio_is_clear(self, index: int) -> Result:
+        return self.condition("clear", index)
+
+    def gpio_write(self, mask: int, levels: int) -> Result:
+        indexes = [index for index in range(32) if mask >> index & 1]
+        return self.apply({index: bool(levels >> index & 1) for index in indexes})
+
+    def gpio_read(self) -> List[Parameter]:
+        inputs = enumerate(self.inputs[: Preat.BULK_PINS])
+        levels = sum(1 << index for index, level in inputs if level)
+        return [Parameter(Parameter.Type.UINT32, levels)]
+
+    # Pseudo-terminal -----------------------------------------------------------------
+
+    def start(self, url: str = None) -> str:
+        if url == None:
+            self._master, self._slave = os.openpty()
+            tty.setraw(self._slave)
+            self._port = os.ttyname(self._slave)
+        else:
+            # Served as a remote ATE, the host connects with the same url
+            self._listener, self._port = transport.listen(url)
+        self._wakeup = os.pipe()
+        self._sink = self.transmit
+        self._running = True
+        self._thread = Thread(target=self.run, name="siru-sim", daemon=True)
+        self._thread.start()
+        return self._port
+
+    def wakeup(self) -> None:
+        if self._wakeup and get_ident() != getattr(self._thread, "ident", None):
+            os.write(self._wakeup[1], b"\x00")
+
+    def run(self) -> None:
+        while self._running:
+            next_event = self.next_event()
+            delay = 0.1 if next_event == None else max(0, next_event - monotonic())
+            sources = [
+                self._wakeup[0],
+                self._listener if self._master == None else self._master,
+            ]
+            ready, _, _ = select.select(sources, [], [], delay)
+            if self._wakeup[0] in ready:
+                os.read(self._wakeup[0], 1024)
+            if self._listener != None and self._listener in ready:
+                self.accept()
+            elif self._master != None and self._master in ready:
+                try:
+                    data = os.read(self._master, 1024)
+                except OSError:
+                    data = b""
+                if not data and self._connection != None:
+                    self.disconnect()
+                self.receive(data)
+            self.poll()
+
+    def transmit(self, frame: bytes) -> None:
+        if self._master != None:
+            os.write(self._master, frame)
+
+    def accept(self) -> None:
+        self._connection, _ = self._listener.accept()
+        if self._connection.family != socket.AF_UNIX:
+            self._connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._master = self._connection.fileno()
+
+    def disconnect(self) -> None:
+        self._master = None
+        self._connection.close()
+        self._connection = None
+
+    def stop(self) -> None:
+        if self._thread:
+            self._running = False
+            self.wakeup()
+            self._thread.join()
+            self._thread = None
+        if self._connection != None:
+            self.disconnect()
+        if self._listener != None:
+            self._listener.close()
+            if self._listener.family == socket.AF_UNIX:
+                os.unlink(self._port.partition("://")[2])
+            self._listener = None
+        for fd in (self._master, self._slave) + tuple(self._wakeup or ()):
+            if fd != None:
+                os.close(fd)
+        self._master = self._slave = self._wakeup = self._port = None
+
+    def __enter__(self) -> "Simulator":
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+
+class Loopback:
+    def __init__(self, simulator: Simulator) -> None:
+        self.simulator = simulator
+        self.timeout = None
+        self._buffer = bytearray()
+        simulator.sink = self._buffer.extend
+
+    @property
+    def in_waiting(self) -> int:
+        self.simulator.poll()
+        return len(self._buffer)
+
+    def write(self, data: bytes) -> int:
+        self.simulator.receive(data)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def read(self, size: int = 1) -> bytes:
+        deadline = None if self.timeout == None else monotonic() + self.timeout
+        self.simulator.poll()
+        while len(self._buffer) < size:
+            next_event = self.simulator.next_event()
+            if next_event == None or (deadline != None and next_event > deadline):
+                # Nothing else will arrive before the timeout, don't wait for it
+                break
+            sleep(max(0, next_event - monotonic()))
+            self.simulator.poll()
+
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def reset_input_buffer(self) -> None:
+        self._buffer.clear()
+
+    def close(self) -> None:
+        self.simulator.sink = None
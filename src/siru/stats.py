@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+
+from collections import Counter
+from typing import Dict, List, Union
+
+METHODS = {
+    0x002: "BLOB.Create",
+    0x003: "BLOB.Update",
+    0x004: "BLOB.Destroy",
+    0x005: "TEST.Assert",
+    0x006: "LINK.Baudrate",
+    0x010: "GPIO.Set",
+    0x011: "GPIO.Clear",
+    0x012: "GPIO.Toggle",
+    0x013: "GPIO.HasRising",
+    0x014: "GPIO.HasFalling",
+    0x015: "GPIO.HasChanged",
+    0x016: "GPIO.IsSet",
+    0x017: "GPIO.IsClear",
+    0x018: "GPIO.Write",
+    0x019: "GPIO.Read",
+}
+
+
+class Histogram:
+    # Log-linear buckets as in HdrHistogram: values below 2^PRECISION are exact,
+    # larger ones keep PRECISION significant bits (under 1% relative error)
+    PRECISION = 7
+
+    def __init__(self, precision: int = PRECISION) -> None:
+        self._precision = precision
+        self._half = 1 << (precision - 1)
+        self._buckets = Counter()
+        self._count = 0
+        self._total = 0
+        self._min = None
+        self._max = None
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def min(self) -> Union[int, None]:
+        return self._min
+
+    @property
+    def max(self) -> Union[int, None]:
+        return self._max
+
+    @property
+    def mean(self) -> Union[float, None]:
+        return self._total / self._count if self._count else None
+
+    def index(self, value: int) -> int:
+        exponent = max(0, value.bit_length() - self._precision)
+        if exponent == 0:
+            return value
+        return exponent * self._half + (value >> exponent)
+
+    def lowest(self, index: int) -> int:
+        if index < 2 * self._half:
+            return index
+        exponent = index // self._half - 1
+        return (index - exponent * self._half) << exponent
+
+    def highest(self, index: int) -> int:
+        return self.lowest(index + 1) - 1
+
+    def record(self, value: int, count: int = 1) -> None:
+        value = max(0, int(value))
+        self._buckets[self.index(value)] += count
+        self._count = self._count + count
+        self._total = self._total + value * count
+        self._min = value if self._min == None else min(self._min, value)
+        self._max = value if self._max == None else max(self._max, value)
+
+    def percentile(self, percentile: float) -> Union[int, None]:
+        if not self._count:
+            return None
+        target = max(1, percentile * self._count / 100)
+        total = 0
+        for index in sorted(self._buckets):
+            total = total + self._buckets[index]
+            if total >= target:
+                return min(self.highest(index), self._max)
+        return self._max
+
+    def merge(self, other: "Histogram") -> None:
+        for index, count in other._buckets.items():
+            self._buckets[index] += count
+        self._count = self._count + other._count
+        self._total = self._total + other._total
+        for value in (other._min, other._max):
+            if value != None:
+                self._min = value if self._min == None else min(self._min, value)
+                self._max = value if self._max == None else max(self._max, value)
+
+    def reset(self) -> None:
+        self._buckets.clear()
+        self._count = 0
+        self._total = 0
+        self._min = None
+        self._max = None
+
+
+class Stats:
+    def __init__(self) -> None:
+        self._latencies = {}
+        self._results = {}
+
+    @property
+    def methods(self) -> List[int]:
+        return sorted(self._results)
+
+    def record(self, method: int, latency: Union[int, None], result) -> None:
+        if latency != None:
+            histogram = self._latencies.get(method)
+            if histogram == None:
+                histogram = self._latencies[method] = Histogram()
+            histogram.record(latency // 1000)
+        results = self._results.get(method)
+        if results == None:
+            results = self._results[method] = Counter()
+        results[result] += 1
+
+    def latency(self, method: int = None) -> Histogram:
+        if method != None:
+            return self._latencies.get(method) or Histogram()
+        result = Histogram()
+        for histogram in self._latencies.values():
+            result.merge(histogram)
+        return result
+
+    def results(self, method: int = None) -> Counter:
+        if method != None:
+            return Counter(self._results.get(method, {}))
+        result = Counter()
+        for results in self._results.values():
+            result.update(results)
+        return result
+
+    def count(self, *results, method: int = None) -> int:
+        counter = self.results(method)
+        return sum(counter[result] for result in results)
+
+    def summary(self) -> Dict[str, Dict]:
+        summary = {}
+        for method in self.methods:
+            histogram = self.latency(method)
+            summary[METHODS.get(method, f"0x{method:03X}")] = {
+                "count": sum(self._results[method].values()),
+                "p50_us": histogram.percentile(50),
+                "p99_us": histogram.percentile(99),
+                "max_us": histogram.max,
+                "results": {
+                    result.name: count
+                    for result, count in self._results[method].items()
+                },
+            }
+        return summary
+
+    def reset(self) -> None:
+        self._latencies.clear()
+        self._results.clear()
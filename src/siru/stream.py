@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+
+import time, asyncio
+from collections import namedtuple
+from typing import List
+from .preat import Result
+from . import gpio
+
+Edge = namedtuple("Edge", ["time", "name", "level", "resolution"])
+
+
+class Stream:
+    PERIOD = 0.001
+
+    def __init__(
+        self,
+        inputs: gpio.List,
+        names: List[str] = None,
+        period: float = PERIOD,
+        duration: float = None,
+    ) -> None:
+        self._inputs = inputs
+        self._names = names
+        self._period = period
+        self._duration = duration
+        self._running = False
+        self._result = Result.NO_ERROR
+        self._samples = 0
+        self._previous = None
+        self._sampled = None
+
+    @property
+    def inputs(self) -> gpio.List:
+        return self._inputs
+
+    @property
+    def result(self) -> Result:
+        return self._result
+
+    @property
+    def samples(self) -> int:
+        return self._samples
+
+    def stop(self) -> None:
+        self._running = False
+
+    def start(self) -> float:
+        self._running = True
+        self._result = Result.NO_ERROR
+        self._samples = 0
+        self._previous = None
+        self._sampled = None
+        return time.perf_counter()
+
+    def deadline(self, start: float) -> float:
+        # Samples are spaced from the start so the period doesn't drift
+        deadline = start + self._samples * self._period
+        if self._duration != None and deadline - start > self._duration:
+            self._running = False
+        return deadline
+
+    def edges(self, start: float, before: float, reply: tuple) -> List[Edge]:
+        result, levels = reply
+        if result != Result.NO_ERROR:
+            self._result = result
+            self._running = False
+            return []
+
+        # The reply is taken at the middle of its round trip
+        sampled = (before + time.perf_counter()) / 2 - start
+        previous = self._previous
+        self._previous = levels
+        self._samples = self._samples + 1
+        if previous == None:
+            self._sampled = sampled
+            return []
+        resolution = sampled - self._sampled
+        self._sampled = sampled
+        return [
+            Edge(sampled, name, level, resolution)
+            for name, level in levels.items()
+            if previous.get(name) != level
+        ]
+
+    def __iter__(self):
+        start = self.start()
+        while self._running:
+            deadline = self.deadline(start)
+            if not self._running:
+                break
+            delay = deadline - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            before = time.perf_counter()
+            yield from self.edges(start, before, self._inputs.read(self._names))
+
+    async def __aiter__(self):
+        start = self.start()
+        while self._running:
+            deadline = self.deadline(start)
+            if not self._running:
+                break
+            await asyncio.sleep(max(0, deadline - time.perf_counter()))
+            before = time.perf_counter()
+            reply = await self._inputs.read(self._names)
+            for edge in self.edges(start, before, reply):
+                yield edge
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+
+import sys, logging
+from enum import Enum
+from time import monotonic_ns
+from collections import namedtuple
+from contextlib import contextmanager
+from typing import Callable, List, TextIO, Union
+
+
+class Direction(Enum):
+    REQUEST = "M->S"
+    RESPONSE = "S->M"
+
+
+Record = namedtuple("Record", ["timestamp", "direction", "frame", "result"])
+
+
+def hexdump(frame: bytes) -> str:
+    # bytes.hex() only takes a separator since Python 3.8
+    return " ".join(f"{byte:02x}" for byte in frame)
+
+
+def format_record(record: Record) -> str:
+    text = f"{record.direction.value}: "
+    if record.frame:
+        text = text + hexdump(record.frame)
+    else:
+        text = text + "(No response)"
+    if record.result != None and record.frame:
+        text = text + f" (Status: {record.result.name})"
+    return text
+
+
+class LoggingSink:
+    def __init__(self, logger: logging.Logger = None, level: int = logging.DEBUG):
+        self.logger = logger or logging.getLogger("siru.preat")
+        self.level = level
+
+    def __call__(self, record: Record) -> None:
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(self.level, format_record(record))
+
+
+class FileSink:
+    def __init__(self, file: Union[str, TextIO]) -> None:
+        self._owned = isinstance(file, str)
+        self.file = open(file, "a") if self._owned else file
+
+    def __call__(self, record: Record) -> None:
+        self.file.write(f"{record.timestamp} {format_record(record)}\n")
+
+    def close(self) -> None:
+        if self._owned:
+            self.file.close()
+
+
+class Trace:
+    SIZE = 256
+
+    def __init__(self, size: int = SIZE) -> None:
+        self._records = [None] * size
+        self._count = 0
+        self._sinks = []
+
+    @property
+    def size(self) -> int:
+        return len(self._records)
+
+    @property
+    def count(self) -> int:
+        return min(self._count, self.size)
+
+    @property
+    def sinks(self) -> List[Callable]:
+        return list(self._sinks)
+
+    def add_sink(self, sink: Callable[[Record], None]) -> None:
+        self._sinks.append(sink)
+
+    def remove_sink(self, sink: Callable[[Record], None]) -> None:
+        self._sinks.remove(sink)
+
+    def record(self, direction: Direction, frame: bytes, result=None) -> Record:
+        record = Record(monotonic_ns(), direction, frame, result)
+        self._records[self._count % len(self._records)] = record
+        self._count = self._count + 1
+        for sink in self._sinks:
+            sink(record)
+        return record
+
+    def last(self, count: int = None) -> List[Record]:
+        count = self.count if count == None else min(count, self.count)
+        return [
+            self._records[index % len(self._records)]
+            for index in range(self._count - count, self._count)
+        ]
+
+    def clear(self) -> None:
+        self._records = [None] * len(self._records)
+        self._count = 0
+
+    def dump(self, count: int = None, file: TextIO = None) -> None:
+        file = file or sys.stderr
+        for record in self.last(count):
+            file.write(f"{record.timestamp} {format_record(record)}\n")
+
+    @contextmanager
+    def on_failure(self, count: int = None, file: TextIO = None):
+        try:
+            yield self
+        except BaseException:
+            self.dump(count, file)
+            raise
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+import socket, select
+from time import monotonic
+from typing import Callable, Dict, Tuple, Union
+from serial import SerialException, serial_for_url
+
+
+def parse_url(url: str) -> Tuple[str, Union[str, Tuple[str, int]]]:
+    scheme, _, location = url.partition("://")
+    scheme = scheme.lower()
+    if scheme == "tcp":
+        host, _, port = location.rpartition(":")
+        return scheme, (host.strip("[]") or "localhost", int(port))
+    return scheme, location
+
+
+def scheme(url: str) -> str:
+    return url.partition("://")[0].lower() if "://" in url else None
+
+
+class SocketTransport:
+    SIZE = 4096
+
+    def __init__(self, connection: socket.socket) -> None:
+        self._socket = connection
+        self._socket.setblocking(False)
+        self._buffer = bytearray()
+        self._output = bytearray()
+        self.timeout = None
+        # Kept for the rate negotiation, it has no meaning on a socket
+        self.baudrate = None
+
+    def fill(self, timeout: float = 0) -> bool:
+        self.flush()
+        ready, _, _ = select.select([self._socket], [], [], timeout)
+        if not ready:
+            return False
+        try:
+            data = self._socket.recv(self.SIZE)
+        except BlockingIOError:
+            return False
+        if not data:
+            raise SerialException("Connection closed by the remote ATE")
+        self._buffer.extend(data)
+        return True
+
+    @property
+    def in_waiting(self) -> int:
+        while self.fill(0):
+            pass
+        return len(self._buffer)
+
+    def read(self, size: int = 1) -> bytes:
+        deadline = None if self.timeout == None else monotonic() + self.timeout
+        while len(self._buffer) < size:
+            delay = None if deadline == None else max(0, deadline - monotonic())
+            if not self.fill(delay):
+                break
+
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def write(self, data: bytes) -> int:
+        # Frames written back to back go out together on the next read or flush
+        self._output.extend(data)
+        return len(data)
+
+    def flush(self) -> None:
+        if self._output:
+            self._socket.setblocking(True)
+            try:
+                self._socket.sendall(self._output)
+            finally:
+                self._socket.setblocking(False)
+            self._output.clear()
+
+    def fileno(self) -> int:
+        self.flush()
+        return self._socket.fileno()
+
+    def reset_input_buffer(self) -> None:
+        self.in_waiting
+        self._buffer.clear()
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            self._socket.close()
+
+
+def open_tcp(url: str, **options) -> SocketTransport:
+    _, address = parse_url(url)
+    connection = socket.create_connection(address)
+    # Frames are tiny, don't let Nagle hold them back waiting for an ACK
+    connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return SocketTransport(connection)
+
+
+def open_unix(url: str, **options) -> SocketTransport:
+    _, path = parse_url(url)
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.connect(path)
+    return SocketTransport(connection)
+
+
+def open_rfc2217(url: str, **options):
+    return serial_for_url(url, **options)
+
+
+TRANSPORTS: Dict[str, Callable] = {
+    "tcp": open_tcp,
+    "unix": open_unix,
+    "rfc2217": open_rfc2217,
+}
+
+
+def register(scheme: str, opener: Callable) -> None:
+    TRANSPORTS[scheme.lower()] = opener
+
+
+def listen(url: str) -> Tuple[socket.socket, str]:
+    kind, address = parse_url(url)
+    if kind == "tcp":
+        host = address[0]
+        family = socket.AF_INET6 if ":" in host else socket.AF_INET
+        listener = socket.socket(family, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind(address)
+        listener.listen()
+        host, port = listener.getsockname()[:2]
+        host = f"[{host}]" if family == socket.AF_INET6 else host
+        return listener, f"tcp://{host}:{port}"
+    elif kind == "unix":
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(address)
+        listener.listen()
+        return listener, url
+    raise ValueError(f"Can't listen on {url}")
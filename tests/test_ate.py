@@ -28,7 +28,8 @@
 ##################################################################################################
 
 import pytest, shutil, filecmp
-from siru.ate import ATE
+from siru.ate import ATE, AsyncATE
+from siru.preat import AsyncPreat
 from typing import Callable
 from tests.utils import DATA_DIR, load_config
 from pathlib import Path
@@ -106,3 +107,30 @@ def test_access_atributes_url_preat_server():
 
     ate.server.url = "/dev/tty.USB_DEVICE"
     assert ate.server.url == "/dev/tty.USB_DEVICE"
+
+
+def test_async_ate_uses_async_server():
+    ate = AsyncATE(**CONFIG)
+    assert isinstance(ate.server, AsyncPreat)
+    assert ate.output_gray.server is ate.server
+
+
+def test_server_serial_options():
+    config = dict(CONFIG, server={"url": "/dev/tty.USB", "baudrate": 2000000})
+    ate = ATE(**config)
+    assert ate.server.baudrate == 2000000
+
+
+def test_resolved_attributes_are_cached():
+    ate = ATE(**CONFIG)
+    output = ate.output_gray
+    assert ate.__dict__["output_gray"] is output
+    assert ate.output_gray is output
+    assert ate.baudrate == ate.server.baudrate
+    assert "baudrate" not in ate.__dict__
+
+
+def test_duplicated_pin_names():
+    outputs = CONFIG["digital_outputs"]
+    with pytest.raises(ValueError):
+        ATE(**dict(CONFIG, digital_outputs=outputs + outputs[:1]))
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+import os, tempfile, multiprocessing, pytest
+from siru.preat import Preat, Parameter, Result
+from siru.gpio import Output, Input
+from siru.sim import Simulator, Loopback
+from siru.broker import Broker, BrokerPreat, Item, HOLD
+
+
+@pytest.fixture
+def simulator():
+    return Simulator()
+
+
+@pytest.fixture
+def broker(simulator):
+    server = Preat("loop")
+    server.port = Loopback(simulator)
+    path = os.path.join(tempfile.mkdtemp(), "ate.sock")
+    with Broker(server, path) as broker:
+        yield broker
+
+
+def stimulus(path, index, results):
+    output = Output(BrokerPreat(path), index)
+    values = [output.set(), output.clear(), output.set()]
+    results.put((index, values))
+
+
+def test_execute_through_broker(broker, simulator):
+    preat = BrokerPreat(broker.path)
+    result = preat.execute(0x010, [Parameter(Parameter.Type.UINT8, 0x02)])
+
+    assert result == Result.NO_ERROR
+    assert simulator.outputs[2] == True
+    assert preat.stats.count(Result.NO_ERROR) == 1
+    assert broker.server.stats.count(Result.NO_ERROR) == 1
+
+
+def test_execute_many_through_broker(broker, simulator):
+    preat = BrokerPreat(broker.path)
+    commands = [(0x010, [Parameter(Parameter.Type.UINT8, index)]) for index in range(6)]
+
+    assert preat.execute_many(commands) == [Result.NO_ERROR] * 6
+    assert simulator.outputs[:6] == [True] * 6
+
+
+def test_processes_share_the_broker(broker, simulator):
+    results = multiprocessing.get_context("fork").Queue()
+    workers = [
+        multiprocessing.get_context("fork").Process(
+            target=stimulus, args=(broker.path, index, results)
+        )
+        for index in range(3)
+    ]
+    for worker in workers:
+        worker.start()
+    values = dict(results.get(timeout=10) for _ in workers)
+    for worker in workers:
+        worker.join()
+
+    assert values == {index: [Result.NO_ERROR] * 3 for index in range(3)}
+    assert simulator.outputs[:3] == [True] * 3
+
+
+def test_timeout_through_broker(broker, simulator):
+    simulator.drop_rate = 1.0
+    preat = BrokerPreat(broker.path)
+    frames = [preat.frame(0x010, [Parameter(Parameter.Type.UINT8, 1)])] * 3
+
+    assert preat.request_many(frames) == [Result.RESPONSE_TIMEOUT] * 3
+    simulator.drop_rate = 0.0
+    assert preat.request(frames[0]) == Result.NO_ERROR
+
+
+def test_wait_through_broker(broker, simulator):
+    simulator.connect(1, 3, delay=0.01)
+    preat = BrokerPreat(broker.path)
+    other = BrokerPreat(broker.path)
+    input = Input(preat, 3)
+
+    assert preat.wait(0, 500, [input.has_rising], Output(preat, 1).set) == (
+        Result.NO_ERROR
+    )
+    assert Output(other, 4).set() == Result.NO_ERROR
+
+
+def test_held_client_is_served_first():
+    broker = Broker(Preat("loop"), "unused")
+    first, second = object(), object()
+    broker._queue.extend(
+        [
+            Item(first, b"a1", 0, HOLD),
+            Item(second, b"b1", 0, 0),
+            Item(first, b"a2", 0, HOLD),
+            Item(first, b"", 0, 0),
+            Item(second, b"b2", 0, 0),
+        ]
+    )
+
+    order = []
+    item = broker.next()
+    while item != None:
+        order.append(item.frame)
+        item = broker.next()
+    assert order == [b"a1", b"a2", b"b1", b"b2"]
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+import pytest
+from siru.preat import Preat, Parameter, Result
+from siru.trace import Direction
+from siru.sim import Simulator, Loopback
+from siru.capture import Capture, Replay
+
+
+def output(index):
+    return [Parameter(Parameter.Type.UINT8, index)]
+
+
+def session(preat: Preat) -> list:
+    results = [preat.execute(0x010 + index % 3, output(index)) for index in range(20)]
+    results.extend(
+        preat.execute_many([(0x013, output(index)) for index in range(8)], window=4)
+    )
+    results.append(preat.execute(0x010, output(99)))
+    return results
+
+
+@pytest.fixture
+def captured(tmp_path):
+    path = str(tmp_path / "session.cap")
+    preat = Preat("loop", capture=path)
+    preat.port = Loopback(Simulator(drop_rate=0.2, seed=7))
+    results = session(preat)
+    preat.close()
+    return path, results, preat
+
+
+def test_capture_records_every_frame(captured):
+    path, results, preat = captured
+    with Capture(path) as capture:
+        records = list(capture)
+
+    assert Result.RESPONSE_TIMEOUT in results
+    assert [record.frame or b"" for record in records] == [
+        record.frame or b"" for record in preat.trace.last(len(records))
+    ]
+    assert len(list(Capture(path).records(Direction.REQUEST))) == 29
+    assert records[0].timestamp < records[-1].timestamp
+
+
+def test_capture_stats(captured):
+    path, results, preat = captured
+    with Capture(path) as capture:
+        stats = capture.stats()
+    assert stats.summary().keys() == preat.stats.summary().keys()
+    for method, summary in preat.stats.summary().items():
+        assert stats.summary()[method]["results"] == summary["results"]
+
+
+def test_replay_session(captured):
+    path, results, _ = captured
+    preat = Preat("replay")
+    preat.port = Replay(path)
+
+    assert session(preat) == results
+    assert preat.port.finished
+
+
+def test_replay_detects_diverging_requests(captured):
+    path, _, _ = captured
+    preat = Preat("replay")
+    preat.port = Replay(path)
+
+    with pytest.raises(ValueError):
+        preat.execute(0x014, output(1))
+
+
+def test_capture_sink_appends(tmp_path):
+    path = str(tmp_path / "session.cap")
+    for _ in range(2):
+        preat = Preat("loop")
+        sink = preat.capture(path)
+        preat.port = Loopback(Simulator())
+        preat.execute(0x010, output(1))
+        sink.close()
+
+    with Capture(path) as capture:
+        assert len(list(capture)) == 4
+
+
+def test_capture_flushed_after_each_response(tmp_path):
+    path = str(tmp_path / "session.cap")
+    preat = Preat("loop", capture=path)
+    preat.port = Loopback(Simulator())
+    preat.execute(0x010, output(1))
+
+    # Still open, as left by a session that hangs and gets killed
+    with Capture(path) as capture:
+        assert len(list(capture)) == 2
+    preat.close()
+    assert preat.trace.sinks == []
+
+
+def test_capture_rejects_other_files(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"not a capture")
+    with pytest.raises(ValueError):
+        Capture(str(path))
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+
+import pytest
+from siru.crc16 import Crc16, CRC16
+from siru import crc16
+
+FRAMES = [
+    b"\x05\x00\x00\xa1\xb5",
+    b"\x07\x00\x11\x10\x01\xcc\x08",
+    b"\x07\x00\x11\x10\x02\x6e\xe2",
+    b"\x07\x00\x11\x10\x03\xbf\x97",
+    b"\x07\x00\x11\x10\x05\x2b\x36",
+    b"\x07\x01\x01\x10\x01\xb5\xa3",
+    b"\x07\x01\x51\x10\x03\xB1\xFA",
+    b"\x11\x00\x54\x33\x00\x00\x00\x64\x00\x00\x13\x88\x11\x01\x00\xCD\x2C",
+]
+
+
+@pytest.mark.parametrize("frame", FRAMES)
+def test_checksum_of_test_vectors(frame):
+    assert CRC16.checksum(frame[:-2]) == int.from_bytes(frame[-2:], "big")
+    assert CRC16.verify(frame, 0x0000)
+
+
+def test_checksum_over_memoryview():
+    buffer = bytearray(64)
+    buffer[: len(FRAMES[5])] = FRAMES[5]
+    assert CRC16.checksum(memoryview(buffer)[:5]) == 0xB5A3
+
+
+def test_table_matches_bitwise_calculation():
+    crc = Crc16()
+    for byte in (0x00, 0x01, 0x80, 0xFF):
+        value = byte << 8
+        for _ in range(8):
+            value = (value << 1) ^ (0xD175 if value & 0x8000 else 0)
+        assert crc.checksum(bytes([byte])) == value & 0xFFFF
+
+
+def test_verify_many_without_numpy(monkeypatch):
+    monkeypatch.setattr(crc16, "numpy", None)
+    corrupted = FRAMES[1][:-1] + b"\x00"
+    assert CRC16.verify_many(FRAMES + [corrupted]) == [True] * len(FRAMES) + [False]
+
+
+def test_verify_many_with_numpy():
+    pytest.importorskip("numpy")
+    corrupted = FRAMES[7][:5] + b"\xff" + FRAMES[7][6:]
+    frames = FRAMES + [corrupted] + FRAMES[:2]
+    expected = [True] * len(FRAMES) + [False, True, True]
+    assert CRC16.verify_many(frames) == expected
+    assert CRC16.verify_many([]) == []
@@ -28,7 +28,8 @@
 ##################################################################################################
 
 import pytest
-from siru.dut import DUT
+from siru.dut import DUT, AsyncDUT
+from siru.ate import AsyncATE
 from tests.utils import DATA_DIR, load_config
 from typing import Callable
 
@@ -85,3 +86,22 @@ def test_undefined_property_raise_exception():
     with pytest.raises(AttributeError) as exc_info:
         dummy = dut.led_none.name
     assert str(exc_info.value) == "DUT object has no attribute led_none"
+
+
+def test_async_dut_uses_async_ate():
+    dut = AsyncDUT(**CONFIG_DICT)
+    assert isinstance(dut.ate, AsyncATE)
+    assert dut.key_left.server is dut.ate.server
+
+
+def test_resolved_attributes_are_cached():
+    dut = DUT(**CONFIG_DICT)
+    key = dut.key_left
+    assert dut.__dict__["key_left"] is key
+    assert dut.key_left is key is dut.ate.output_red
+
+
+def test_duplicated_connection_names():
+    inputs = CONFIG_DICT["digital_inputs"]
+    with pytest.raises(ValueError):
+        DUT(**dict(CONFIG_DICT, digital_inputs=inputs + inputs[:1]))
@@ -38,7 +38,11 @@ def serial_port(mocker):
     serial_port.init = mocker.patch.object(Serial, "__init__", return_value=None)
     serial_port.write = mocker.patch.object(Serial, "write", return_value=None)
     serial_port.read = mocker.patch.object(Serial, "read")
+    serial_port.reset = mocker.patch.object(Serial, "reset_input_buffer")
     serial_port.timeout = mocker.patch.object(Serial, "timeout")
+    serial_port.in_waiting = mocker.patch.object(
+        Serial, "in_waiting", new_callable=mocker.PropertyMock, return_value=0
+    )
     return serial_port
 
 
@@ -241,3 +245,68 @@ def test_input_rissing_key_left(serial_port, inputs_list):
     result = inputs_list.key_left.has_changed()
     serial_port.write.assert_called_once_with(INPUT_CHANGED_TWO)
     assert result == Result.NO_ERROR
+
+
+def test_output_frames_encoded_once(serial_port, outputs_list, mocker):
+    serial_port.read.side_effect = [ACK_NO_ERROR[:1], ACK_NO_ERROR[1:]] * 3
+    encode = mocker.spy(Preat, "encode")
+
+    outputs_list.led_green.set()
+    outputs_list.led_green.set()
+    outputs_list.led_green.clear()
+
+    assert encode.call_count == 2
+    assert serial_port.write.call_args_list[1][0][0] == OUTPUT_SET_ONE
+
+
+OUTPUT_WRITE_RED_BLUE = b"\x0e\x01\x82\x33\x00\x00\x00\x05\x00\x00\x00\x01\x33\xc2"
+
+
+def test_list_write_sends_one_frame(serial_port, outputs_list):
+    serial_port.read.return_value = ACK_NO_ERROR
+
+    result = outputs_list.write({"led_red": True, "led_blue": False})
+
+    assert result == Result.NO_ERROR
+    serial_port.write.assert_called_once_with(OUTPUT_WRITE_RED_BLUE)
+
+
+def test_list_write_unknown_output(serial_port, outputs_list):
+    with pytest.raises(AttributeError):
+        outputs_list.write({"led_white": True})
+
+
+def test_list_pins_named_like_members(serial_port):
+    serial_port.read.return_value = ACK_NO_ERROR
+    outputs = List(Preat("/dev/tty.USB"), Output, [{"name": "read"}, {"name": "count"}])
+
+    assert outputs.write({"read": True, "count": False}) == Result.NO_ERROR
+    assert outputs.pin("read") is outputs.list[0]
+    with pytest.raises(AttributeError):
+        outputs.write({"server": True})
+
+
+def test_list_rejects_duplicated_names():
+    with pytest.raises(ValueError):
+        List(Preat("/dev/tty.USB"), Output, [{"name": "led"}, {"name": "led"}])
+
+
+def test_list_lookup_by_name(outputs_list):
+    assert outputs_list.led_blue is outputs_list.list[2]
+    with pytest.raises(AttributeError):
+        outputs_list.led_white
+
+
+def test_gpio_compact_representation(outputs_list):
+    output = outputs_list.list[0]
+    assert not hasattr(output, "__dict__")
+    with pytest.raises(AttributeError):
+        output.color = "red"
+    assert output.map is output.map
+    assert dict(output.map) == {
+        "name": "led_red",
+        "index": 0,
+        "gpio_bit": "HAL_GPIO_1",
+    }
+    with pytest.raises(TypeError):
+        output.map["name"] = "led_white"
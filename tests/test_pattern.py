@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+
+import time, pytest
+from serial import Serial
+from siru.preat import Preat, AsyncPreat, ThreadedPreat, Result
+from siru.gpio import List, Output
+from siru.pattern import Pattern, Event
+from siru.sim import Simulator
+
+OUTPUT_SET_ONE = b"\x07\x01\x01\x10\x01\xb5\xa3"
+OUTPUT_CLEAR_ONE = b"\x07\x01\x11\x10\x01\x71\xff"
+OUTPUT_CLEAR_TWO = b"\x07\x01\x11\x10\x02\xd3\x15"
+
+ACK_NO_ERROR = b"\x05\x00\x00\xa1\xb5"
+
+CONFIG = [
+    {"name": "led_red", "gpio_bit": "HAL_GPIO_1"},
+    {"name": "led_green", "gpio_bit": "HAL_GPIO_2"},
+    {"name": "led_blue", "gpio_bit": "HAL_GPIO_3"},
+]
+
+
+@pytest.fixture
+def serial_port(mocker):
+    serial_port.init = mocker.patch.object(Serial, "__init__", return_value=None)
+    serial_port.write = mocker.patch.object(Serial, "write", return_value=None)
+    serial_port.read = mocker.patch.object(Serial, "read")
+    serial_port.flush = mocker.patch.object(Serial, "flush")
+    serial_port.reset = mocker.patch.object(Serial, "reset_input_buffer")
+    serial_port.read.side_effect = lambda size: ACK_NO_ERROR
+    serial_port.timeout = mocker.patch.object(Serial, "timeout")
+    serial_port.in_waiting = mocker.patch.object(
+        Serial, "in_waiting", new_callable=mocker.PropertyMock, return_value=0
+    )
+    return serial_port
+
+
+@pytest.fixture
+def outputs():
+    return List(Preat("/dev/tty.USB"), Output, CONFIG)
+
+
+def test_pattern_events_in_time_order(outputs):
+    pattern = Pattern(outputs, [(0.02, "led_blue", False), (0.01, "led_green", True)])
+    assert pattern.events == [
+        Event(0.01, outputs.led_green, True),
+        Event(0.02, outputs.led_blue, False),
+    ]
+    assert pattern.duration == 0.02
+    assert [frame for _, frame in pattern.schedule()] == [
+        OUTPUT_SET_ONE,
+        OUTPUT_CLEAR_TWO,
+    ]
+
+
+def test_pattern_pulses(outputs):
+    pattern = Pattern(outputs).pwm(0.0, "led_red", 0.01, 0.25, 2)
+    assert [(event.time, event.level) for event in pattern.events] == [
+        (0.0, True),
+        (0.0025, False),
+        (0.01, True),
+        (0.0125, False),
+    ]
+
+
+def test_pattern_invalid_events(outputs):
+    with pytest.raises(AttributeError):
+        Pattern(outputs).add(0.0, "led_white", True)
+    with pytest.raises(ValueError):
+        Pattern(outputs).add(-0.001, "led_red", True)
+    with pytest.raises(ValueError):
+        Pattern(outputs).pwm(0.0, "led_red", 0.01, 1.5, 2)
+
+
+def test_pattern_play_on_deadlines(serial_port, outputs):
+    pattern = Pattern(outputs).pulse(0.005, "led_green", 0.01)
+    pattern.add(0.02, "led_blue", False)
+    playback = pattern.play()
+    assert [call[0][0] for call in serial_port.write.call_args_list] == [
+        OUTPUT_SET_ONE,
+        OUTPUT_CLEAR_ONE,
+        OUTPUT_CLEAR_TWO,
+    ]
+    assert serial_port.flush.call_count == 3
+    assert playback.result == Result.NO_ERROR
+    assert [item.time for item in playback.timings] == [0.005, 0.015, 0.02]
+    assert all(0 <= error < 0.01 for error in playback.errors)
+    assert playback.max_error < 0.01
+
+
+def test_pattern_play_threaded(serial_port):
+    outputs = List(ThreadedPreat("/dev/tty.USB"), Output, CONFIG)
+    playback = Pattern(outputs, [(0.0, "led_green", True)]).play()
+    outputs.server.stop()
+    serial_port.write.assert_called_once_with(OUTPUT_SET_ONE)
+    assert playback.result == Result.NO_ERROR
+
+
+def test_pattern_play_async_not_supported(outputs):
+    outputs = List(AsyncPreat("/dev/tty.USB"), Output, CONFIG)
+    with pytest.raises(TypeError):
+        Pattern(outputs, [(0.0, "led_green", True)]).play()
+
+
+def test_pattern_play_on_remote_ate():
+    simulator = Simulator()
+    arrivals = []
+    handle = simulator.handle
+    simulator.handle = lambda frame: arrivals.append(time.perf_counter()) or handle(
+        frame
+    )
+    try:
+        outputs = List(Preat(simulator.start("tcp://127.0.0.1:0")), Output, CONFIG)
+        pattern = Pattern(outputs).pulse(0.0, "led_red", 0.1).pulse(0.2, "led_red", 0.1)
+        playback = pattern.play()
+        outputs.server.port.close()
+    finally:
+        simulator.stop()
+
+    assert playback.result == Result.NO_ERROR
+    assert len(arrivals) == 4
+    gaps = [second - first for first, second in zip(arrivals, arrivals[1:])]
+    assert all(gap > 0.05 for gap in gaps)
@@ -27,10 +27,12 @@
 # SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
 ##################################################################################################
 
-import pytest
-from serial import Serial
+import pytest, asyncio
+from types import SimpleNamespace
+from serial import Serial, SerialException
 from pytest_mock import MockerFixture
-from siru.preat import Preat, Parameter, Result
+from siru import gpio
+from siru.preat import Preat, AsyncPreat, ThreadedPreat, Decoder, Parameter, Result
 
 EXECUTE_OUTPUT_SINGLE_PARAM = b"\x07\x01\x01\x10\x01\xb5\xa3"
 EXECUTE_ASSERT = b"\x11\x00\x54\x33\x00\x00\x00\x64\x00\x00\x13\x88\x11\x01\x00\xCD\x2C"
@@ -70,7 +72,11 @@ def mock_serial_port_init(mocker):
     mocker.init = mocker.patch.object(Serial, "__init__", return_value=None)
     mocker.write = mocker.patch.object(Serial, "write", return_value=None)
     mocker.read = mocker.patch.object(Serial, "read")
+    mocker.reset = mocker.patch.object(Serial, "reset_input_buffer")
     mocker.timeout = mocker.patch.object(Serial, "timeout")
+    mocker.in_waiting = mocker.patch.object(
+        Serial, "in_waiting", new_callable=mocker.PropertyMock, return_value=0
+    )
 
 
 def test_execute_command(mocker: MockerFixture):
@@ -233,3 +239,788 @@ def test_change_port_after_open(mocker: MockerFixture):
     result = preat.execute(0x010, [Parameter(Parameter.Type.UINT8, 0x01)])
     mocker.init.assert_called_once_with(port="/dev/tty.USB_DEVICE", baudrate=115200)
     assert result == Result.RESPONSE_TIMEOUT
+
+
+def test_execute_many_in_order(mocker: MockerFixture):
+    mocker.read.side_effect = [
+        ACK_NO_ERROR[:1],
+        ACK_NO_ERROR[1:],
+        NACK_METHOD_ERROR[:1],
+        NACK_METHOD_ERROR[1:],
+        ACK_NO_ERROR[:1],
+        ACK_NO_ERROR[1:],
+    ]
+
+    preat = Preat("/dev/tty.USB")
+    results = preat.execute_many(
+        [
+            (0x010, [Parameter(Parameter.Type.UINT8, 0x01)]),
+            (0x010, [Parameter(Parameter.Type.UINT8, 0x01)]),
+            (0x015, [Parameter(Parameter.Type.UINT8, 0x03)]),
+        ]
+    )
+
+    assert mocker.write.call_count == 3
+    assert mocker.write.call_args_list[2][0][0] == EXECUTE_INPUT_SINGLE_PARAM
+    assert results == [Result.NO_ERROR, Result.METHOD_ERROR, Result.NO_ERROR]
+
+
+def test_execute_many_keeps_window_in_flight(mocker: MockerFixture):
+    in_flight = []
+
+    def read(size):
+        in_flight.append(mocker.write.call_count)
+        return ACK_NO_ERROR[:1] if size == 1 else ACK_NO_ERROR[1:]
+
+    mocker.read.side_effect = read
+
+    preat = Preat("/dev/tty.USB")
+    command = (0x010, [Parameter(Parameter.Type.UINT8, 0x01)])
+    results = preat.execute_many([command] * 5, window=2)
+
+    assert in_flight[::2] == [2, 3, 4, 5, 5]
+    assert results == [Result.NO_ERROR] * 5
+
+
+def test_execute_many_timeout_on_response(mocker: MockerFixture):
+    mocker.read.side_effect = [ACK_NO_ERROR[:1], ACK_NO_ERROR[1:], None]
+
+    preat = Preat("/dev/tty.USB")
+    command = (0x010, [Parameter(Parameter.Type.UINT8, 0x01)])
+    results = preat.execute_many([command] * 4, window=2)
+
+    assert mocker.write.call_count == 3
+    assert results == [Result.NO_ERROR] + [Result.RESPONSE_TIMEOUT] * 3
+    mocker.reset.assert_called_once()
+
+
+def test_async_execute_command(mocker: MockerFixture):
+    mocker.read.side_effect = [ACK_NO_ERROR[:1], ACK_NO_ERROR[1:]]
+
+    preat = AsyncPreat("/dev/tty.USB")
+    result = asyncio.run(preat.execute(0x010, [Parameter(Parameter.Type.UINT8, 0x01)]))
+
+    mocker.write.assert_called_once_with(EXECUTE_OUTPUT_SINGLE_PARAM)
+    assert result == Result.NO_ERROR
+
+
+def test_async_response_in_partial_reads(mocker: MockerFixture):
+    mocker.read.side_effect = [
+        b"",
+        ACK_NO_ERROR[:1],
+        ACK_NO_ERROR[1:3],
+        b"",
+        ACK_NO_ERROR[3:],
+    ]
+
+    preat = AsyncPreat("/dev/tty.USB")
+    result = asyncio.run(preat.execute(0x010, [Parameter(Parameter.Type.UINT8, 0x01)]))
+
+    assert result == Result.NO_ERROR
+
+
+def test_async_timeout_on_response(mocker: MockerFixture):
+    mocker.read.return_value = b""
+
+    preat = AsyncPreat("/dev/tty.USB")
+    preat.TIMEOUT = 0.01
+    result = asyncio.run(preat.execute(0x010, [Parameter(Parameter.Type.UINT8, 0x01)]))
+
+    assert result == Result.RESPONSE_TIMEOUT
+
+
+def test_async_execute_assert_single_condition(mocker: MockerFixture):
+    mocker.read.side_effect = [ACK_NO_ERROR[:1], ACK_NO_ERROR[1:]] * 3
+
+    preat = AsyncPreat("/dev/tty.USB")
+    input = FakeInput(preat, 0x03)
+    output = FakeOutput(preat, 0x01)
+    result = asyncio.run(preat.wait(100, 5000, [input.is_set], output.set))
+
+    assert mocker.write.call_args_list[0][0][0] == EXECUTE_ASSERT
+    assert mocker.write.call_args_list[1][0][0] == EXECUTE_INPUT_SINGLE_PARAM
+    assert mocker.write.call_args_list[2][0][0] == EXECUTE_OUTPUT_SINGLE_PARAM
+    assert result == Result.NO_ERROR
+
+
+def test_async_commands_on_same_server_dont_interleave(mocker: MockerFixture):
+    responses = []
+
+    def write(frame):
+        responses.extend([ACK_NO_ERROR[:1], ACK_NO_ERROR[1:]])
+
+    def read(size):
+        return responses.pop(0) if responses else b""
+
+    mocker.write.side_effect = write
+    mocker.read.side_effect = read
+
+    async def main(preat):
+        input = FakeInput(preat, 0x03)
+        output = FakeOutput(preat, 0x01)
+        return await asyncio.gather(
+            preat.wait(100, 5000, [input.is_set], output.set),
+            output.set(),
+        )
+
+    results = asyncio.run(main(AsyncPreat("/dev/tty.USB")))
+
+    frames = [call[0][0] for call in mocker.write.call_args_list]
+    assert frames[:3] == [
+        EXECUTE_ASSERT,
+        EXECUTE_INPUT_SINGLE_PARAM,
+        EXECUTE_OUTPUT_SINGLE_PARAM,
+    ]
+    assert results == [Result.NO_ERROR, Result.NO_ERROR]
+
+
+def test_decoder_split_frames():
+    decoder = Decoder(Preat("/dev/tty.USB").crc)
+    decoder.feed(ACK_NO_ERROR[:2])
+    assert decoder.frame() == None
+    assert decoder.needed == 3
+
+    decoder.feed(ACK_NO_ERROR[2:] + NACK_CRC_ERROR)
+    assert decoder.frame() == ACK_NO_ERROR
+    assert decoder.frame() == NACK_CRC_ERROR
+    assert decoder.frame() == None
+    assert decoder.partial == False
+
+
+def test_decoder_resynchronise_after_garbage():
+    decoder = Decoder(Preat("/dev/tty.USB").crc)
+    decoder.feed(b"\x00\xff\x07\x11" + ACK_NO_ERROR + b"\x06" + NACK_METHOD_ERROR)
+
+    assert decoder.frame() == ACK_NO_ERROR
+    assert decoder.frame() == NACK_METHOD_ERROR
+    assert decoder.discarded == 5
+
+
+def test_corrupted_response_is_a_crc_error(mocker: MockerFixture):
+    mocker.read.side_effect = [ACK_NO_ERROR[:-1] + b"\x00"]
+
+    preat = Preat("/dev/tty.USB")
+    result = preat.execute(0x010, [Parameter(Parameter.Type.UINT8, 0x01)])
+
+    assert result == Result.RESPONSE_CRC_ERROR
+    assert preat.stats.count(Result.RESPONSE_CRC_ERROR) == 1
+
+
+def test_corrupted_response_keeps_pipeline_order(mocker: MockerFixture):
+    mocker.in_waiting.return_value = 3 * len(ACK_NO_ERROR)
+    mocker.read.side_effect = [
+        ACK_NO_ERROR[:-1] + b"\x00" + ACK_NO_ERROR + NACK_PARAMETERS_ERROR
+    ]
+
+    preat = Preat("/dev/tty.USB")
+    command = (0x010, [Parameter(Parameter.Type.UINT8, 0x01)])
+    results = preat.execute_many([command] * 3, window=3)
+
+    assert results == [
+        Result.RESPONSE_CRC_ERROR,
+        Result.NO_ERROR,
+        Result.PARAMETERS_ERROR,
+    ]
+
+
+def test_stray_bytes_before_response(mocker: MockerFixture):
+    mocker.read.side_effect = [
+        b"\x42",
+        b"\x00\x00\x00" + ACK_NO_ERROR[:2],
+        ACK_NO_ERROR[2:],
+    ]
+
+    preat = Preat("/dev/tty.USB")
+    result = preat.execute(0x010, [Parameter(Parameter.Type.UINT8, 0x01)])
+
+    assert result == Result.NO_ERROR
+
+
+def test_buffered_responses_without_reading(mocker: MockerFixture):
+    mocker.in_waiting.return_value = 2 * len(ACK_NO_ERROR)
+    mocker.read.side_effect = [ACK_NO_ERROR + NACK_PARAMETERS_ERROR]
+
+    preat = Preat("/dev/tty.USB")
+    first = preat.execute(0x010, [Parameter(Parameter.Type.UINT8, 0x01)])
+    second = preat.execute(0x010, [Parameter(Parameter.Type.UINT8, 0x01)])
+
+    mocker.read.assert_called_once_with(2 * len(ACK_NO_ERROR))
+    assert first == Result.NO_ERROR
+    assert second == Result.PARAMETERS_ERROR
+
+
+def test_frame_cache_reuses_encoded_frames(mocker: MockerFixture):
+    encode = mocker.spy(Preat, "encode")
+
+    preat = Preat("/dev/tty.USB")
+    first = preat.frame(0x010, [Parameter(Parameter.Type.UINT8, 0x01)])
+    second = preat.frame(0x010, [Parameter(Parameter.Type.UINT8, 0x01)])
+
+    assert first == second == EXECUTE_OUTPUT_SINGLE_PARAM
+    assert encode.call_count == 1
+
+
+def test_binary_frames_are_not_cached():
+    preat = Preat("/dev/tty.USB")
+    for data in (b"ab", bytearray(b"ab"), memoryview(bytearray(b"ab"))):
+        frame = preat.frame(
+            0x003,
+            [
+                Parameter(Parameter.Type.UINT8, 0x05),
+                Parameter(Parameter.Type.UINT16, 0),
+                Parameter(Parameter.Type.BINARY, data),
+            ],
+        )
+        assert frame[-4:-2] == b"ab"
+    assert len(preat._frames) == 0
+
+
+def test_frame_cache_is_bounded(mocker: MockerFixture):
+    encode = mocker.spy(Preat, "encode")
+
+    preat = Preat("/dev/tty.USB")
+    preat.FRAMES = 2
+    preat.frame(0x010, [Parameter(Parameter.Type.UINT8, 0x01)])
+    preat.frame(0x010, [Parameter(Parameter.Type.UINT8, 0x02)])
+    preat.frame(0x010, [Parameter(Parameter.Type.UINT8, 0x01)])
+    preat.frame(0x010, [Parameter(Parameter.Type.UINT8, 0x03)])
+    assert encode.call_count == 3
+
+    preat.frame(0x010, [Parameter(Parameter.Type.UINT8, 0x01)])
+    assert encode.call_count == 3
+    preat.frame(0x010, [Parameter(Parameter.Type.UINT8, 0x02)])
+    assert encode.call_count == 4
+
+
+def test_encode_frame_too_long():
+    preat = Preat("/dev/tty.USB")
+    parameters = [Parameter(Parameter.Type.UINT32, index) for index in range(14)]
+    assert len(preat.encode(0x010, parameters[:13])) == 64
+
+    with pytest.raises(ValueError):
+        preat.encode(0x010, parameters)
+
+    parameters = [Parameter(Parameter.Type.UINT32, index) for index in range(20)]
+    with pytest.raises(ValueError):
+        preat.encode(0x010, parameters)
+    with pytest.raises(ValueError):
+        preat.encode(0x003, [Parameter(Parameter.Type.BINARY, bytes(60))])
+
+
+def test_execute_is_traced(mocker: MockerFixture):
+    mocker.read.side_effect = [ACK_NO_ERROR[:1], ACK_NO_ERROR[1:]]
+
+    preat = Preat("/dev/tty.USB")
+    preat.execute(0x010, [Parameter(Parameter.Type.UINT8, 0x01)])
+
+    request, response = preat.trace.last()
+    assert request.frame == EXECUTE_OUTPUT_SINGLE_PARAM
+    assert response.frame == ACK_NO_ERROR
+    assert response.result == Result.NO_ERROR
+
+
+def test_execute_records_stats(mocker: MockerFixture):
+    mocker.read.side_effect = [ACK_NO_ERROR, NACK_METHOD_ERROR, b""]
+
+    preat = Preat("/dev/tty.USB")
+    preat.execute(0x010, [Parameter(Parameter.Type.UINT8, 0x01)])
+    preat.execute(0x015, [Parameter(Parameter.Type.UINT8, 0x03)])
+    preat.execute(0x010, [Parameter(Parameter.Type.UINT8, 0x01)])
+
+    assert preat.stats.latency(0x010).count == 1
+    assert preat.stats.results(0x010)[Result.RESPONSE_TIMEOUT] == 1
+    assert preat.stats.results(0x015)[Result.METHOD_ERROR] == 1
+
+
+BLOB_CREATE = b"\x0b\x00\x22\x13\x05\x00\x00\x00\x64\x06\x16"
+BLOB_UPDATE = b"\x0d\x00\x33\x12\x05\x00\x10\x83\xaa\xbb\xcc\x36\xc7"
+
+
+def test_encode_blob_parameters():
+    preat = Preat("/dev/tty.USB")
+    assert preat.blob_frame(0x05, 0x0010, b"\xaa\xbb\xcc") == BLOB_UPDATE
+    assert Parameter(Parameter.Type.BINARY, b"\xaa\xbb").encode() == b"\x82\xaa\xbb"
+    assert Parameter(Parameter.Type.BLOB, 0x05).encode() == b"\x70\x05"
+
+
+def test_blob_chunks_fit_in_frames():
+    preat = Preat("/dev/tty.USB")
+    chunks = preat.blob_chunks(0x05, bytes(range(256)) * 4)
+
+    assert [offset for offset, _ in chunks] == list(range(0, 1024, preat.CHUNK))
+    assert all(len(frame) <= Preat.MAX_LENGTH for _, frame in chunks)
+    assert len(chunks[0][1]) == Preat.MAX_LENGTH
+    assert chunks[1][1][5:7] == preat.CHUNK.to_bytes(2, "big")
+
+
+def test_upload_blob(mocker: MockerFixture):
+    mocker.read.return_value = ACK_NO_ERROR
+
+    preat = Preat("/dev/tty.USB")
+    result = preat.upload_blob(0x05, bytes(100))
+
+    frames = [call[0][0] for call in mocker.write.call_args_list]
+    assert frames[0] == BLOB_CREATE
+    assert len(frames) == 3
+    assert result == Result.NO_ERROR
+
+
+def test_upload_blob_retries_failed_chunks(mocker: MockerFixture):
+    mocker.read.side_effect = [
+        ACK_NO_ERROR,
+        ACK_NO_ERROR,
+        NACK_CRC_ERROR,
+        ACK_NO_ERROR,
+        ACK_NO_ERROR,
+    ]
+
+    preat = Preat("/dev/tty.USB")
+    result = preat.upload_blob(0x05, bytes(3 * preat.CHUNK))
+
+    frames = [call[0][0] for call in mocker.write.call_args_list]
+    assert len(frames) == 5
+    assert frames[4] == frames[2]
+    assert result == Result.NO_ERROR
+
+
+def test_upload_blob_stops_on_protocol_error(mocker: MockerFixture):
+    mocker.read.side_effect = [ACK_NO_ERROR, NACK_PARAMETERS_ERROR, ACK_NO_ERROR]
+
+    preat = Preat("/dev/tty.USB")
+    result = preat.upload_blob(0x05, bytes(2 * preat.CHUNK))
+
+    assert mocker.write.call_count == 3
+    assert result == Result.PARAMETERS_ERROR
+
+
+def test_upload_blob_too_large():
+    preat = Preat("/dev/tty.USB")
+    with pytest.raises(ValueError):
+        preat.blob_chunks(0x05, bytes(preat.MAX_BLOB + 1))
+
+
+def test_destroy_blob(mocker: MockerFixture):
+    mocker.read.return_value = ACK_NO_ERROR
+
+    preat = Preat("/dev/tty.USB")
+    result = preat.destroy_blob(0x05)
+
+    assert mocker.write.call_args[0][0][1:5] == b"\x00\x41\x10\x05"
+    assert result == Result.NO_ERROR
+
+
+def test_async_upload_blob(mocker: MockerFixture):
+    mocker.read.return_value = ACK_NO_ERROR
+
+    preat = AsyncPreat("/dev/tty.USB")
+    result = asyncio.run(preat.upload_blob(0x05, bytes(100)))
+
+    assert mocker.write.call_count == 3
+    assert result == Result.NO_ERROR
+
+
+def test_serial_options(mocker: MockerFixture):
+    mocker.read.return_value = ACK_NO_ERROR
+    low_latency = mocker.patch.object(Serial, "set_low_latency_mode", create=True)
+    buffer_size = mocker.patch.object(Serial, "set_buffer_size", create=True)
+
+    preat = Preat(
+        "/dev/tty.USB",
+        baudrate="3000000",
+        low_latency=True,
+        read_buffer_size=8192,
+        rtscts=True,
+    )
+    preat.execute(0x010, [Parameter(Parameter.Type.UINT8, 0x01)])
+
+    mocker.init.assert_called_once_with(
+        port="/dev/tty.USB", baudrate=3000000, rtscts=True
+    )
+    low_latency.assert_called_once_with(True)
+    buffer_size.assert_called_once_with(rx_size=8192)
+    assert preat.baudrate == 3000000
+
+
+def test_negotiate_baudrate(mocker: MockerFixture):
+    baudrate = mocker.patch.object(Serial, "baudrate", new_callable=mocker.PropertyMock)
+    mocker.read.side_effect = [
+        NACK_PARAMETERS_ERROR,
+        ACK_NO_ERROR,
+        ACK_NO_ERROR,
+        ACK_NO_ERROR,
+    ]
+
+    preat = Preat("/dev/tty.USB", baudrates=[3000000, 1000000, 115200])
+    result = preat.execute(0x010, [Parameter(Parameter.Type.UINT8, 0x01)])
+
+    frames = [call[0][0] for call in mocker.write.call_args_list]
+    assert frames[0][1:3] == b"\x00\x61"
+    assert frames[0][4:8] == (3000000).to_bytes(4, "big")
+    assert frames[1][4:8] == frames[2][4:8] == (1000000).to_bytes(4, "big")
+    assert frames[3] == EXECUTE_OUTPUT_SINGLE_PARAM
+    assert preat.baudrate == 1000000
+    baudrate.assert_called_with(1000000)
+    assert result == Result.NO_ERROR
+
+
+def test_async_negotiate_on_first_request(mocker: MockerFixture):
+    mocker.patch.object(Serial, "baudrate", new_callable=mocker.PropertyMock)
+    mocker.read.side_effect = [ACK_NO_ERROR, ACK_NO_ERROR, ACK_NO_ERROR, ACK_NO_ERROR]
+
+    async def session(preat):
+        command = [Parameter(Parameter.Type.UINT8, 0x01)]
+        return [await preat.execute(0x010, command) for _ in range(2)]
+
+    preat = AsyncPreat("/dev/tty.USB", baudrates=[1000000])
+    assert asyncio.run(session(preat)) == [Result.NO_ERROR] * 2
+
+    frames = [call[0][0] for call in mocker.write.call_args_list]
+    assert frames[0] == frames[1] == preat.baudrate_frame(1000000)
+    assert frames[2:] == [EXECUTE_OUTPUT_SINGLE_PARAM] * 2
+    assert preat.baudrate == 1000000
+
+
+def test_negotiate_without_firmware_support(mocker: MockerFixture):
+    mocker.read.side_effect = [NACK_METHOD_ERROR]
+
+    preat = Preat("/dev/tty.USB", baudrates=[3000000, 1000000])
+    assert preat.port
+    assert preat.baudrate == 115200
+    assert mocker.write.call_count == 1
+
+
+def test_negotiate_falls_back_without_confirmation(mocker: MockerFixture):
+    mocker.patch.object(Serial, "baudrate", new_callable=mocker.PropertyMock)
+    mocker.read.side_effect = [ACK_NO_ERROR, NACK_CRC_ERROR]
+
+    preat = Preat("/dev/tty.USB")
+    assert preat.negotiate([1000000]) == 115200
+    assert preat.baudrate == 115200
+
+
+def test_threaded_execute_command(mocker: MockerFixture):
+    mocker.read.return_value = ACK_NO_ERROR
+
+    preat = ThreadedPreat("/dev/tty.USB")
+    result = preat.execute(0x010, [Parameter(Parameter.Type.UINT8, 0x01)])
+
+    assert result == Result.NO_ERROR
+    mocker.write.assert_called_once_with(EXECUTE_OUTPUT_SINGLE_PARAM)
+    assert preat._thread.name == "preat /dev/tty.USB"
+    preat.stop()
+
+
+def test_threaded_queue_is_coalesced(mocker: MockerFixture):
+    writes = []
+    mocker.read.side_effect = lambda size: writes.append(mocker.write.call_count) or (
+        ACK_NO_ERROR
+    )
+    mocker.patch.object(ThreadedPreat, "start")
+
+    preat = ThreadedPreat("/dev/tty.USB")
+    frame = preat.frame(0x010, [Parameter(Parameter.Type.UINT8, 0x01)])
+    futures = [preat.submit(frame) for _ in range(3)]
+    preat._queue.put(None)
+    preat.run()
+
+    assert [future.result() for future in futures] == [Result.NO_ERROR] * 3
+    assert writes[0] == 3
+
+
+def test_threaded_frames_after_lost_reply_are_requeued(mocker: MockerFixture):
+    mocker.read.side_effect = [None, ACK_NO_ERROR, NACK_PARAMETERS_ERROR]
+    mocker.patch.object(ThreadedPreat, "start")
+
+    preat = ThreadedPreat("/dev/tty.USB")
+    frame = preat.frame(0x010, [Parameter(Parameter.Type.UINT8, 0x01)])
+    futures = [preat.submit(frame, window=1) for _ in range(3)]
+    preat._queue.put(None)
+    preat.run()
+
+    assert [future.result() for future in futures] == [
+        Result.RESPONSE_TIMEOUT,
+        Result.NO_ERROR,
+        Result.PARAMETERS_ERROR,
+    ]
+    assert mocker.write.call_count == 3
+
+
+def test_threaded_retries_keep_order(mocker: MockerFixture):
+    mocker.read.side_effect = [NACK_CRC_ERROR, ACK_NO_ERROR, NACK_PARAMETERS_ERROR]
+    mocker.patch.object(ThreadedPreat, "start")
+
+    preat = ThreadedPreat("/dev/tty.USB", retries=2)
+    first = preat.frame(0x010, [Parameter(Parameter.Type.UINT8, 0x01)])
+    second = preat.frame(0x011, [Parameter(Parameter.Type.UINT8, 0x01)])
+    futures = [preat.submit(first, retry=True), preat.submit(second)]
+    preat._queue.put(None)
+    preat.run()
+
+    assert [future.result() for future in futures] == [
+        Result.NO_ERROR,
+        Result.PARAMETERS_ERROR,
+    ]
+    frames = [call[0][0] for call in mocker.write.call_args_list]
+    assert frames == [first, first, second]
+
+
+def test_threaded_errors_are_raised_in_callers(mocker: MockerFixture):
+    mocker.write.side_effect = OSError("Device disconnected")
+
+    preat = ThreadedPreat("/dev/tty.USB")
+    with pytest.raises(OSError):
+        preat.execute(0x010, [Parameter(Parameter.Type.UINT8, 0x01)])
+    preat.stop()
+
+
+def usb_port(location, device):
+    return SimpleNamespace(location=location, device=device)
+
+
+@pytest.fixture
+def comports(mocker: MockerFixture):
+    Preat.forget()
+    mocker.patch("siru.preat.os.path.exists", return_value=True)
+    yield mocker.patch(
+        "siru.preat.list_ports.comports",
+        return_value=[
+            usb_port("1-1.2:1.0", "/dev/ttyUSB0"),
+            usb_port("1-1.3:1.0", "/dev/ttyUSB1"),
+        ],
+    )
+    Preat.forget()
+
+
+def test_resolve_many_usb_locations_at_once(comports):
+    urls = ["usb://1-1.3", "/dev/ttyACM0", "usb://1-1.2", "usb://2-1"]
+    assert Preat.resolve(urls) == [
+        "/dev/ttyUSB1",
+        "/dev/ttyACM0",
+        "/dev/ttyUSB0",
+        "usb://2-1",
+    ]
+    assert comports.call_count == 1
+
+    assert Preat("usb://1-1.2").serial_url() == "/dev/ttyUSB0"
+    assert comports.call_count == 1
+
+
+def test_serial_opens_resolved_usb_device(mocker: MockerFixture, comports):
+    mocker.read.return_value = ACK_NO_ERROR
+    Preat("usb://1-1.3").execute(0x010, [Parameter(Parameter.Type.UINT8, 0x01)])
+    mocker.init.assert_called_once_with(port="/dev/ttyUSB1", baudrate=115200)
+
+
+def test_failed_open_resolves_again(mocker: MockerFixture, comports):
+    Preat.resolve(["usb://1-1.2"])
+    comports.return_value = [usb_port("1-1.2:1.0", "/dev/ttyUSB4")]
+    mocker.init.side_effect = [SerialException("No such device"), None]
+
+    assert Preat("usb://1-1.2").port
+    assert mocker.init.call_args[1]["port"] == "/dev/ttyUSB4"
+    assert comports.call_count == 2
+
+
+def test_missing_device_resolves_again(mocker: MockerFixture, comports):
+    Preat.resolve(["usb://1-1.2"])
+    mocker.patch("siru.preat.os.path.exists", return_value=False)
+    Preat.resolve(["usb://1-1.2"])
+    assert comports.call_count == 2
+
+
+def test_idempotent_methods_are_retried(mocker: MockerFixture):
+    mocker.read.side_effect = [NACK_CRC_ERROR, b"", ACK_NO_ERROR]
+
+    preat = Preat("/dev/tty.USB", retries=2)
+    result = preat.execute(0x010, [Parameter(Parameter.Type.UINT8, 0x01)])
+
+    assert result == Result.NO_ERROR
+    assert mocker.write.call_count == 3
+
+
+def test_toggle_is_never_retried(mocker: MockerFixture):
+    mocker.read.return_value = NACK_CRC_ERROR
+
+    preat = Preat("/dev/tty.USB", retries=2)
+    result = preat.execute(0x012, [Parameter(Parameter.Type.UINT8, 0x01)])
+
+    assert result == Result.CRC_ERROR
+    assert mocker.write.call_count == 1
+
+
+def test_edge_queries_are_never_retried(mocker: MockerFixture):
+    mocker.read.return_value = NACK_CRC_ERROR
+
+    preat = Preat("/dev/tty.USB", retries=2)
+    for method in (0x013, 0x014, 0x015):
+        mocker.write.reset_mock()
+        result = preat.execute(method, [Parameter(Parameter.Type.UINT8, 0x03)])
+        assert result == Result.CRC_ERROR
+        assert mocker.write.call_count == 1
+
+
+def test_retries_are_bounded(mocker: MockerFixture):
+    mocker.read.return_value = NACK_CRC_ERROR
+
+    preat = Preat("/dev/tty.USB", retries=2)
+    result = preat.execute(0x016, [Parameter(Parameter.Type.UINT8, 0x01)])
+
+    assert result == Result.CRC_ERROR
+    assert mocker.write.call_count == 3
+
+
+def test_adaptive_timeout(mocker: MockerFixture):
+    preat = Preat("/dev/tty.USB", adaptive=True)
+    assert preat.response_timeout == Preat.TIMEOUT
+
+    for _ in range(20):
+        preat.estimate(0.002)
+    assert preat.response_timeout == Preat.MIN_TIMEOUT
+
+    for _ in range(20):
+        preat.estimate(0.050)
+    assert 0.050 < preat.response_timeout < 0.100
+
+    mocker.read.return_value = b""
+    timeout = preat.response_timeout
+    assert preat.receive() == Result.RESPONSE_TIMEOUT
+    assert preat.response_timeout == 2 * timeout
+    assert preat.port.timeout == timeout
+
+
+def test_fixed_timeout_by_default():
+    preat = Preat("/dev/tty.USB")
+    preat.estimate(0.002)
+    assert preat.response_timeout == Preat.TIMEOUT
+
+
+def test_decode_parameters():
+    data = b"\x12\x05\x01\x00\x37\x00\x00\x00\x64\x02\x83\xaa\xbb\xcc"
+    parameters = Parameter.decode(data, 5)
+
+    assert [(item.type, item.value) for item in parameters[:4]] == [
+        (Parameter.Type.UINT8, 5),
+        (Parameter.Type.UINT16, 0x100),
+        (Parameter.Type.UINT32, 100),
+        (Parameter.Type.BLOB, 2),
+    ]
+    assert parameters[4].type == Parameter.Type.BINARY
+    assert bytes(parameters[4].value) == b"\xaa\xbb\xcc"
+
+
+def test_decode_parameters_without_copies():
+    data = bytearray(b"\x82\x01\x02")
+    value = Parameter.decode(data, 1)[0].value
+    data[1] = 0xFF
+    assert bytes(value) == b"\xff\x02"
+
+
+def test_decode_invalid_parameters():
+    with pytest.raises(ValueError):
+        Parameter.decode(b"\x13\x05\x00", 2)
+    with pytest.raises(ValueError):
+        Parameter.decode(b"\x90\x05", 1)
+    with pytest.raises(ValueError):
+        Parameter.decode(b"\x10\x05\x00", 1)
+
+
+def test_query_returns_values(mocker: MockerFixture):
+    preat = Preat("/dev/tty.USB")
+    mocker.read.return_value = preat.encode(
+        0x000,
+        [Parameter(Parameter.Type.UINT16, 0x0102), Parameter(Parameter.Type.UINT8, 3)],
+    )
+
+    result, values = preat.query(0x017, [Parameter(Parameter.Type.UINT8, 0x01)])
+
+    assert result == Result.NO_ERROR
+    assert [item.value for item in values] == [0x0102, 3]
+
+
+def test_query_without_values_on_error(mocker: MockerFixture):
+    mocker.read.return_value = NACK_PARAMETERS_ERROR
+
+    preat = Preat("/dev/tty.USB")
+    result, values = preat.query(0x017, [Parameter(Parameter.Type.UINT8, 0x01)])
+
+    assert result == Result.PARAMETERS_ERROR
+    assert values == []
+
+
+def test_async_and_threaded_query(mocker: MockerFixture):
+    reply = Preat("/dev/tty.USB").encode(0x000, [Parameter(Parameter.Type.UINT8, 7)])
+    mocker.read.return_value = reply
+    mocker.in_waiting.return_value = len(reply)
+    parameters = [Parameter(Parameter.Type.UINT8, 0x01)]
+
+    async def query():
+        return await AsyncPreat("/dev/tty.USB").query(0x017, parameters)
+
+    result, values = asyncio.run(query())
+    assert (result, values[0].value) == (Result.NO_ERROR, 7)
+
+    preat = ThreadedPreat("/dev/tty.USB")
+    result, values = preat.query(0x017, parameters)
+    assert (result, values[0].value) == (Result.NO_ERROR, 7)
+    preat.stop()
+
+
+def test_wait_sends_a_single_burst(mocker: MockerFixture):
+    writes = []
+    replies = iter([ACK_NO_ERROR, ACK_NO_ERROR, ACK_NO_ERROR, NACK_TIMEOUT_ERROR])
+    mocker.read.side_effect = lambda size: writes.append(mocker.write.call_count) or (
+        next(replies)
+    )
+
+    preat = Preat("/dev/tty.USB")
+    inputs = [gpio.Input(preat, 3).has_rising, gpio.Input(preat, 4).has_changed]
+    result = preat.wait(100, 5000, inputs, gpio.Output(preat, 1).set)
+
+    assert result == Result.TIMEOUT_ERROR
+    assert writes[0] == 4
+    frames = [call[0][0] for call in mocker.write.call_args_list]
+    assert frames[0][1:3] == b"\x00\x54"
+    assert frames[1:] == [
+        preat.encode(0x013, [Parameter(Parameter.Type.UINT8, 3)]),
+        preat.encode(0x015, [Parameter(Parameter.Type.UINT8, 4)]),
+        EXECUTE_OUTPUT_SINGLE_PARAM,
+    ]
+    assert preat.port.timeout == Preat.TIMEOUT + 5
+
+
+def test_wait_with_conditions_from_another_board(mocker: MockerFixture):
+    preat = Preat("/dev/tty.USB")
+    other = Preat("/dev/tty.USB1")
+    inputs = [gpio.Input(other, 3).has_rising]
+    output = gpio.Output(preat, 1).set
+
+    assert preat.burst(100, 5000, inputs, output) == None
+    assert preat.burst(100, 5000, [gpio.Input(preat, 3).has_rising], output) != None
+
+
+def test_wait_stops_on_assert_error(mocker: MockerFixture):
+    mocker.read.side_effect = [NACK_PARAMETERS_ERROR] + [ACK_NO_ERROR] * 2
+
+    preat = Preat("/dev/tty.USB")
+    result = preat.wait(
+        0, 10, [gpio.Input(preat, 3).has_rising], gpio.Output(preat, 1).set
+    )
+
+    assert result == Result.PARAMETERS_ERROR
+
+
+def test_parameter_interned_instances():
+    parameter = Parameter.intern(Parameter.Type.UINT8, 0x05)
+    assert Parameter.intern(Parameter.Type.UINT8, 0x05) is parameter
+    assert Parameter.intern(Parameter.Type.UINT16, 0x05) is not parameter
+    assert Parameter(Parameter.Type.UINT8, 0x05) == parameter
+    assert hash(Parameter(Parameter.Type.UINT8, 0x05)) == hash(parameter)
+    assert Parameter(Parameter.Type.UINT8, 0x06) != parameter
+    assert not hasattr(parameter, "__dict__")
+
+
+def test_parameter_decode_builds_fresh_values():
+    data = Parameter.Type.UINT8.value << 4 | Parameter.Type.UINT8.value
+    first, second = Parameter.decode(bytes([data, 0x07, 0x07]), 2)
+    assert first == second and first is not second
+    assert first is not Parameter.intern(Parameter.Type.UINT8, 0x07)
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+
+import os, time, threading, pytest
+from siru.preat import Preat, ThreadedPreat, Parameter, Result
+from siru.gpio import Output, Input, List as GpioList
+from siru.sim import Simulator, Loopback, parse_parameters, status_frame
+
+ACK_NO_ERROR = b"\x05\x00\x00\xa1\xb5"
+NACK_METHOD_ERROR = b"\x07\x00\x11\x10\x02\x6e\xe2"
+NACK_PARAMETERS_ERROR = b"\x07\x00\x11\x10\x03\xbf\x97"
+NACK_TIMEOUT_ERROR = b"\x07\x00\x11\x10\x05\x2b\x36"
+
+OUTPUT_SET_ONE = b"\x07\x01\x01\x10\x01\xb5\xa3"
+OUTPUT_CLEAR_TWO = b"\x07\x01\x11\x10\x02\xd3\x15"
+INPUT_CHANGED_TWO = b"\x07\x01\x51\x10\x02\x60\x8f"
+EXECUTE_ASSERT = b"\x11\x00\x54\x33\x00\x00\x00\x64\x00\x00\x13\x88\x11\x01\x00\xCD\x2C"
+
+needs_pty = pytest.mark.skipif(not hasattr(os, "openpty"), reason="requires a pty")
+
+
+@pytest.fixture
+def simulator():
+    simulator = Simulator()
+    simulator.replies = []
+    simulator.sink = simulator.replies.append
+    return simulator
+
+
+def test_status_frames():
+    assert status_frame(Result.NO_ERROR) == ACK_NO_ERROR
+    assert status_frame(Result.METHOD_ERROR) == NACK_METHOD_ERROR
+
+
+def test_parse_parameters():
+    assert parse_parameters(EXECUTE_ASSERT[3:-2], 4) == [100, 5000, 1, 0]
+    assert parse_parameters(b"\x12\x05\x00\x10\x83\xaa\xbb\xcc", 3) == [
+        5,
+        16,
+        b"\xaa\xbb\xcc",
+    ]
+    with pytest.raises(ValueError):
+        parse_parameters(b"\x13\x05\x00", 2)
+
+
+def test_outputs(simulator):
+    simulator.receive(OUTPUT_SET_ONE + OUTPUT_CLEAR_TWO)
+    assert simulator.outputs[:3] == [False, True, False]
+    assert simulator.replies == [ACK_NO_ERROR, ACK_NO_ERROR]
+
+
+def test_bad_parameters(simulator):
+    preat = Preat("sim")
+    simulator.receive(preat.encode(0x010, [Parameter(Parameter.Type.UINT8, 0x40)]))
+    simulator.receive(preat.encode(0x010, []))
+    assert simulator.replies == [NACK_PARAMETERS_ERROR, NACK_PARAMETERS_ERROR]
+
+
+def test_method_error(simulator):
+    preat = Preat("sim")
+    simulator.receive(preat.encode(0x099, []))
+    assert simulator.replies == [NACK_METHOD_ERROR]
+
+
+def test_ignores_corrupted_frames(simulator):
+    simulator.receive(b"\x07\x01\x01\x10\x01\xb5\xa4" + OUTPUT_SET_ONE)
+    assert simulator.replies == [ACK_NO_ERROR]
+
+
+def test_input_edges_are_latched(simulator):
+    simulator.set_input(2, True)
+    simulator.receive(INPUT_CHANGED_TWO)
+    simulator.receive(INPUT_CHANGED_TWO)
+    assert simulator.replies == [ACK_NO_ERROR, NACK_TIMEOUT_ERROR]
+
+
+def test_assert_waits_for_condition(simulator):
+    preat = Preat("sim")
+    simulator.connect(1, 3, delay=0.02)
+    simulator.receive(EXECUTE_ASSERT)
+    simulator.receive(preat.encode(0x016, [Parameter(Parameter.Type.UINT8, 3)]))
+    simulator.receive(OUTPUT_SET_ONE)
+    assert simulator.replies == [ACK_NO_ERROR, ACK_NO_ERROR]
+
+    time.sleep(0.03)
+    simulator.poll()
+    assert simulator.replies[2] == status_frame(Result.TOO_EARLY_ERROR)
+
+
+def test_blobs(simulator):
+    preat = Preat("sim")
+    simulator.receive(preat.blob_frame(1, 0, b"\x01"))
+    assert simulator.replies[-1] == status_frame(Result.UNDEFINED_ERROR)
+
+    simulator.receive(
+        preat.encode(
+            0x002,
+            [Parameter(Parameter.Type.UINT8, 1), Parameter(Parameter.Type.UINT32, 4)],
+        )
+    )
+    for _, frame in preat.blob_chunks(1, b"\xaa\xbb"):
+        simulator.receive(frame)
+    assert simulator.blobs[1] == bytearray(b"\xaa\xbb\x00\x00")
+
+    simulator.receive(preat.blob_frame(1, 3, b"\x01\x02"))
+    assert simulator.replies[-1] == NACK_PARAMETERS_ERROR
+
+
+def test_error_injection():
+    simulator = Simulator(drop_rate=1.0)
+    replies = []
+    simulator.sink = replies.append
+    simulator.receive(OUTPUT_SET_ONE)
+    assert replies == []
+
+    simulator = Simulator(corrupt_rate=1.0)
+    simulator.sink = replies.append
+    simulator.receive(OUTPUT_SET_ONE)
+    assert len(replies) == 1 and replies[0] != ACK_NO_ERROR
+
+    preat = Preat("loop")
+    preat.port = Loopback(Simulator(corrupt_rate=1.0))
+    assert Output(preat, 1).set() == Result.RESPONSE_CRC_ERROR
+    assert preat.stats.count(Result.RESPONSE_CRC_ERROR) == 1
+
+
+@needs_pty
+def test_preat_over_pty():
+    with Simulator() as simulator:
+        simulator.connect(1, 3, delay=0.02)
+        preat = Preat(simulator.port)
+        output = Output(preat, 1)
+        input = Input(preat, 3)
+
+        assert output.clear() == Result.NO_ERROR
+        assert preat.wait(0, 500, [input.has_rising], output.set) == Result.NO_ERROR
+        assert preat.upload_blob(7, bytes(range(150))) == Result.NO_ERROR
+        assert simulator.blobs[7] == bytes(range(150))
+        preat.port.close()
+
+
+@needs_pty
+def test_reply_latency_over_pty():
+    with Simulator(latency=0.02) as simulator:
+        preat = Preat(simulator.port)
+        start = time.monotonic()
+        assert Output(preat, 0).set() == Result.NO_ERROR
+        assert time.monotonic() - start >= 0.02
+        preat.port.close()
+
+
+def test_preat_over_loopback():
+    simulator = Simulator(latency=0.005)
+    simulator.connect(1, 3, delay=0.01)
+    preat = Preat("loop")
+    preat.port = Loopback(simulator)
+    output = Output(preat, 1)
+    input = Input(preat, 3)
+
+    assert output.clear() == Result.NO_ERROR
+    assert preat.wait(0, 500, [input.has_rising], output.set) == Result.NO_ERROR
+    assert (
+        preat.execute_many([(0x010, [Parameter(Parameter.Type.UINT8, 2)])] * 8)
+        == [Result.NO_ERROR] * 8
+    )
+    assert simulator.outputs[2] == True
+
+
+def test_loopback_timeout_does_not_wait():
+    preat = Preat("loop")
+    preat.port = Loopback(Simulator(drop_rate=1.0))
+
+    start = time.monotonic()
+    assert Output(preat, 0).set() == Result.RESPONSE_TIMEOUT
+    assert time.monotonic() - start < preat.TIMEOUT
+
+
+def test_negotiate_baudrate_with_simulator():
+    simulator = Simulator(baudrates=[115200, 921600, 2000000])
+    preat = Preat("loop", baudrates=[3000000, 2000000, 921600])
+    preat.port = Loopback(simulator)
+
+    assert preat.negotiate() == 2000000
+    assert simulator.baudrate == 2000000
+
+    preat = Preat("loop", baudrates=[3000000])
+    preat.port = Loopback(Simulator())
+    assert preat.negotiate() == 115200
+
+
+def test_threads_share_one_connection():
+    simulator = Simulator(latency=0.0005)
+    preat = ThreadedPreat("loop")
+    preat.port = Loopback(simulator)
+    results = []
+
+    def stimulus(index):
+        output = Output(preat, index)
+        for _ in range(20):
+            results.append(output.set())
+            results.append(output.clear())
+        results.append(output.set())
+
+    threads = [threading.Thread(target=stimulus, args=(index,)) for index in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    preat.stop()
+
+    assert results == [Result.NO_ERROR] * 164
+    assert simulator.outputs[:4] == [True] * 4
+
+
+def test_retries_over_a_lossy_link():
+    simulator = Simulator(drop_rate=0.2, corrupt_rate=0.1, seed=3)
+    preat = Preat("loop", adaptive=True, retries=4)
+    preat.port = Loopback(simulator)
+    output = Output(preat, 1)
+
+    results = [output.set() for _ in range(30)]
+    assert results == [Result.NO_ERROR] * 30
+    assert preat.stats.count(Result.RESPONSE_TIMEOUT) > 0
+
+
+def test_status_frame_with_values():
+    frame = status_frame(Result.NO_ERROR, [Parameter(Parameter.Type.UINT16, 300)])
+    assert frame[1:3] == b"\x00\x01"
+    assert parse_parameters(frame[3:-2], frame[2] & 0x0F) == [300]
+    assert Preat("sim").decode(frame) == Result.NO_ERROR
+
+
+def test_status_frame_matches_host_encoder():
+    parameters = [
+        Parameter(Parameter.Type.UINT8, 3),
+        Parameter(Parameter.Type.BINARY, b"abc"),
+        Parameter(Parameter.Type.UINT16, 300),
+        Parameter(Parameter.Type.UINT32, 7),
+    ]
+    frame = status_frame(Result.NO_ERROR, parameters)
+    assert frame == Preat("sim").encode(0x000, parameters)
+
+
+def gpio_lists(preat):
+    names = [{"name": f"pin_{index}"} for index in range(4)]
+    return GpioList(preat, Output, names), GpioList(preat, Input, names)
+
+
+def test_bulk_gpio():
+    simulator = Simulator()
+    for index in range(4):
+        simulator.connect(index, index)
+    preat = Preat("loop")
+    preat.port = Loopback(simulator)
+    outputs, inputs = gpio_lists(preat)
+
+    result = outputs.write({"pin_0": True, "pin_2": True, "pin_3": False})
+    assert result == Result.NO_ERROR
+    assert simulator.outputs[:4] == [True, False, True, False]
+    assert len(simulator.received) == 1
+
+    assert inputs.read() == (
+        Result.NO_ERROR,
+        {"pin_0": True, "pin_1": False, "pin_2": True, "pin_3": False},
+    )
+    assert inputs.read(["pin_2"]) == (Result.NO_ERROR, {"pin_2": True})
+    assert len(simulator.received) == 3
+
+
+def test_bulk_gpio_fallback_on_older_firmware():
+    simulator = Simulator()
+    del simulator._methods[0x018]
+    del simulator._methods[0x019]
+    for index in range(4):
+        simulator.connect(index, index)
+    preat = Preat("loop")
+    preat.port = Loopback(simulator)
+    outputs, inputs = gpio_lists(preat)
+
+    assert outputs.write({"pin_1": True, "pin_3": True}) == Result.NO_ERROR
+    assert simulator.outputs[:4] == [False, True, False, True]
+    assert len(simulator.received) == 3
+
+    assert outputs.write({"pin_1": False}) == Result.NO_ERROR
+    assert len(simulator.received) == 4
+
+    result, levels = inputs.read()
+    assert result == Result.NO_ERROR
+    assert levels == {"pin_0": False, "pin_1": False, "pin_2": False, "pin_3": True}
+    assert len(simulator.received) == 8
+
+
+def test_bulk_gpio_beyond_32_pins():
+    simulator = Simulator(outputs=40, inputs=40)
+    simulator.connect(35, 35)
+    simulator.connect(2, 2)
+    preat = Preat("loop")
+    preat.port = Loopback(simulator)
+    names = [{"name": f"pin_{index}", "index": index} for index in (2, 35)]
+    outputs, inputs = GpioList(preat, Output, names), GpioList(preat, Input, names)
+
+    assert outputs.write({"pin_2": True, "pin_35": True}) == Result.NO_ERROR
+    assert simulator.outputs[35] and simulator.outputs[2]
+    assert len(simulator.received) == 2
+    assert inputs.read() == (Result.NO_ERROR, {"pin_2": True, "pin_35": True})
+    assert len(simulator.received) == 4
+    assert inputs.read(["pin_2"]) == (Result.NO_ERROR, {"pin_2": True})
+    assert len(simulator.received) == 5
+    assert simulator.gpio_read()[0].value == 1 << 2
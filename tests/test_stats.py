@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+
+from siru.preat import Result
+from siru.stats import Histogram, Stats
+
+
+def test_histogram_exact_small_values():
+    histogram = Histogram()
+    for value in range(1, 101):
+        histogram.record(value)
+
+    assert histogram.count == 100
+    assert histogram.min == 1
+    assert histogram.max == 100
+    assert histogram.mean == 50.5
+    assert histogram.percentile(50) == 50
+    assert histogram.percentile(99) == 99
+    assert histogram.percentile(100) == 100
+
+
+def test_histogram_relative_precision():
+    histogram = Histogram()
+    for value in (1000, 10000, 100000, 1000000):
+        histogram.reset()
+        histogram.record(value)
+        histogram.record(2 * value)
+        assert abs(histogram.percentile(50) - value) <= value / 64
+
+
+def test_histogram_buckets_are_contiguous():
+    histogram = Histogram()
+    for index in range(1, 1000):
+        assert histogram.lowest(index) == histogram.highest(index - 1) + 1
+        assert histogram.index(histogram.lowest(index)) == index
+
+
+def test_histogram_merge():
+    first = Histogram()
+    second = Histogram()
+    first.record(10)
+    second.record(20, count=3)
+    first.merge(second)
+
+    assert first.count == 4
+    assert first.min == 10
+    assert first.max == 20
+    assert first.percentile(50) == 20
+
+
+def test_empty_histogram():
+    histogram = Histogram()
+    assert histogram.percentile(50) == None
+    assert histogram.mean == None
+
+
+def test_stats_per_method():
+    stats = Stats()
+    stats.record(0x010, 100_000, Result.NO_ERROR)
+    stats.record(0x010, 750_000, Result.NO_ERROR)
+    stats.record(0x010, None, Result.RESPONSE_TIMEOUT)
+    stats.record(0x005, 1_000_000, Result.PARAMETERS_ERROR)
+
+    assert stats.methods == [0x005, 0x010]
+    assert stats.latency(0x010).count == 2
+    assert stats.latency(0x010).max == 750
+    assert stats.latency().count == 3
+    assert stats.results(0x010)[Result.RESPONSE_TIMEOUT] == 1
+    assert stats.count(Result.RESPONSE_TIMEOUT, Result.PARAMETERS_ERROR) == 2
+
+    summary = stats.summary()
+    assert summary["GPIO.Set"]["count"] == 3
+    assert summary["GPIO.Set"]["p50_us"] == 100
+    assert summary["TEST.Assert"]["results"] == {"PARAMETERS_ERROR": 1}
+
+    stats.reset()
+    assert stats.methods == []
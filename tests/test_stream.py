@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+
+import pytest, asyncio
+from serial import Serial
+from siru.preat import Preat, AsyncPreat, Parameter, Result
+from siru.gpio import List, Input
+from siru.sim import status_frame
+from siru.stream import Stream
+
+CONFIG = [{"name": "button"}, {"name": "led"}, {"name": "buzzer"}]
+
+
+def levels(*values) -> list:
+    return [
+        status_frame(Result.NO_ERROR, [Parameter(Parameter.Type.UINT32, value)])
+        for value in values
+    ]
+
+
+@pytest.fixture
+def serial_port(mocker):
+    serial_port.init = mocker.patch.object(Serial, "__init__", return_value=None)
+    serial_port.write = mocker.patch.object(Serial, "write", return_value=None)
+    serial_port.read = mocker.patch.object(Serial, "read")
+    serial_port.reset = mocker.patch.object(Serial, "reset_input_buffer")
+    serial_port.timeout = mocker.patch.object(Serial, "timeout")
+    serial_port.in_waiting = mocker.patch.object(
+        Serial, "in_waiting", new_callable=mocker.PropertyMock, return_value=0
+    )
+    return serial_port
+
+
+def test_stream_yields_edges(serial_port):
+    serial_port.read.side_effect = levels(0b000, 0b010, 0b010, 0b011, 0b001)
+    stream = Stream(List(Preat("/dev/tty.USB"), Input, CONFIG), period=0.001)
+
+    edges = []
+    for edge in stream:
+        edges.append(edge)
+        if len(edges) == 3:
+            stream.stop()
+
+    assert [(edge.name, edge.level) for edge in edges] == [
+        ("led", True),
+        ("button", True),
+        ("led", False),
+    ]
+    assert stream.samples == 5
+    assert stream.result == Result.NO_ERROR
+    assert edges[0].time < edges[1].time < edges[2].time
+    assert all(edge.resolution > 0 for edge in edges)
+
+
+def test_stream_of_selected_inputs(serial_port):
+    serial_port.read.side_effect = levels(0b000, 0b011, 0b111)
+    stream = Stream(List(Preat("/dev/tty.USB"), Input, CONFIG), ["buzzer"], 0.001)
+
+    edge = next(iter(stream))
+
+    assert (edge.name, edge.level) == ("buzzer", True)
+    assert stream.samples == 3
+
+
+def test_stream_stops_on_error(serial_port):
+    serial_port.read.side_effect = levels(0b000) + [
+        status_frame(Result.UNDEFINED_ERROR)
+    ]
+    stream = Stream(List(Preat("/dev/tty.USB"), Input, CONFIG), period=0.001)
+
+    assert list(stream) == []
+    assert stream.result == Result.UNDEFINED_ERROR
+
+
+def test_stream_ends_after_duration(serial_port):
+    serial_port.read.side_effect = lambda size: levels(0b000)[0]
+    stream = Stream(
+        List(Preat("/dev/tty.USB"), Input, CONFIG), period=0.001, duration=0.0045
+    )
+
+    assert list(stream) == []
+    assert stream.samples == 5
+
+
+def test_async_stream_yields_edges(serial_port):
+    serial_port.read.side_effect = levels(0b000, 0b100, 0b000)
+    stream = Stream(List(AsyncPreat("/dev/tty.USB"), Input, CONFIG), period=0.001)
+
+    async def collect():
+        edges = []
+        async for edge in stream:
+            edges.append((edge.name, edge.level))
+            if len(edges) == 2:
+                stream.stop()
+        return edges
+
+    assert asyncio.run(collect()) == [("buzzer", True), ("buzzer", False)]
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+
+import io, logging, pytest
+from siru.preat import Result
+from siru.trace import Trace, Direction, LoggingSink, FileSink, format_record
+
+REQUEST = b"\x07\x01\x01\x10\x01\xb5\xa3"
+RESPONSE = b"\x05\x00\x00\xa1\xb5"
+
+
+def test_records_in_order():
+    trace = Trace()
+    trace.record(Direction.REQUEST, REQUEST)
+    trace.record(Direction.RESPONSE, RESPONSE, Result.NO_ERROR)
+
+    records = trace.last()
+    assert [record.direction for record in records] == [
+        Direction.REQUEST,
+        Direction.RESPONSE,
+    ]
+    assert records[1].frame == RESPONSE
+    assert records[1].result == Result.NO_ERROR
+    assert records[0].timestamp <= records[1].timestamp
+
+
+def test_ring_keeps_last_records():
+    trace = Trace(size=4)
+    for index in range(10):
+        trace.record(Direction.REQUEST, bytes([index]))
+
+    assert trace.count == 4
+    assert [record.frame for record in trace.last()] == [
+        b"\x06",
+        b"\x07",
+        b"\x08",
+        b"\x09",
+    ]
+    assert [record.frame for record in trace.last(2)] == [b"\x08", b"\x09"]
+
+    trace.clear()
+    assert trace.last() == []
+
+
+def test_format_records():
+    trace = Trace()
+    trace.record(Direction.REQUEST, REQUEST)
+    trace.record(Direction.RESPONSE, RESPONSE, Result.NO_ERROR)
+    trace.record(Direction.RESPONSE, b"", Result.RESPONSE_TIMEOUT)
+
+    lines = [format_record(record) for record in trace.last()]
+    assert lines == [
+        "M->S: 07 01 01 10 01 b5 a3",
+        "S->M: 05 00 00 a1 b5 (Status: NO_ERROR)",
+        "S->M: (No response)",
+    ]
+
+
+def test_callback_sink():
+    trace = Trace()
+    records = []
+    trace.add_sink(records.append)
+    trace.record(Direction.REQUEST, REQUEST)
+    trace.remove_sink(records.append)
+    trace.record(Direction.REQUEST, REQUEST)
+
+    assert len(records) == 1
+    assert records[0].frame == REQUEST
+
+
+def test_logging_sink(caplog):
+    trace = Trace()
+    trace.add_sink(LoggingSink())
+    with caplog.at_level(logging.DEBUG, logger="siru.preat"):
+        trace.record(Direction.REQUEST, REQUEST)
+
+    assert caplog.messages == ["M->S: 07 01 01 10 01 b5 a3"]
+
+
+def test_file_sink(tmp_path):
+    sink = FileSink(str(tmp_path / "trace.log"))
+    trace = Trace()
+    trace.add_sink(sink)
+    trace.record(Direction.RESPONSE, RESPONSE, Result.NO_ERROR)
+    sink.close()
+
+    content = (tmp_path / "trace.log").read_text()
+    assert content.endswith("S->M: 05 00 00 a1 b5 (Status: NO_ERROR)\n")
+
+
+def test_dump_on_failure():
+    trace = Trace()
+    trace.record(Direction.REQUEST, REQUEST)
+    trace.record(Direction.RESPONSE, RESPONSE, Result.NO_ERROR)
+    output = io.StringIO()
+
+    with pytest.raises(AssertionError):
+        with trace.on_failure(1, output):
+            assert False
+
+    lines = output.getvalue().splitlines()
+    assert len(lines) == 1
+    assert lines[0].endswith("S->M: 05 00 00 a1 b5 (Status: NO_ERROR)")
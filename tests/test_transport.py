@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+##################################################################################################
+# Copyright (c) 2022-2023, Laboratorio de Microprocesadores
+# Facultad de Ciencias Exactas y Tecnología, Universidad Nacional de Tucumán
+# https://www.microprocesadores.unt.edu.ar/
+#
+# Copyright (c) 2022-2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and
+# associated documentation files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge, publish, distribute,
+# sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial
+# portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT
+# NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES
+# OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# SPDX-License-Identifier: MIT
+# SPDX-FileCopyrightText: 2023, Esteban Volentini <evolentini@herrera.unt.edu.ar>
+##################################################################################################
+import os, asyncio, socket, tempfile, pytest
+from serial import SerialException
+from siru.preat import Preat, AsyncPreat, Parameter, Result
+from siru.gpio import Output
+from siru.sim import Simulator
+from siru.transport import SocketTransport, TRANSPORTS, parse_url, register
+
+
+def commands(count):
+    return [(0x010, [Parameter(Parameter.Type.UINT8, index)]) for index in range(count)]
+
+
+@pytest.fixture
+def simulator():
+    simulator = Simulator()
+    yield simulator
+    simulator.stop()
+
+
+def test_parse_url():
+    assert parse_url("tcp://lab-pi.local:7000") == ("tcp", ("lab-pi.local", 7000))
+    assert parse_url("tcp://[::1]:7000") == ("tcp", ("::1", 7000))
+    assert parse_url("unix:///run/siru/ate.sock") == ("unix", "/run/siru/ate.sock")
+
+
+def test_registered_transport():
+    opened = []
+    register("fake", lambda url, **options: opened.append((url, options)) or url)
+    try:
+        preat = Preat("fake://ate", baudrate=9600)
+        assert preat.port == "fake://ate"
+        assert opened == [("fake://ate", {"baudrate": 9600})]
+    finally:
+        del TRANSPORTS["fake"]
+
+
+def test_tcp_transport(simulator):
+    preat = Preat(simulator.start("tcp://127.0.0.1:0"))
+
+    assert Output(preat, 3).set() == Result.NO_ERROR
+    assert preat.execute_many(commands(8)) == [Result.NO_ERROR] * 8
+    assert simulator.outputs[:8] == [True] * 8
+    preat.port.close()
+
+
+def test_unix_transport(simulator):
+    path = os.path.join(tempfile.mkdtemp(), "ate.sock")
+    preat = Preat(simulator.start(f"unix://{path}"))
+
+    assert preat.execute_many(commands(4)) == [Result.NO_ERROR] * 4
+    preat.port.close()
+    simulator.stop()
+    assert not os.path.exists(path)
+
+
+def test_async_tcp_transport(simulator):
+    preat = AsyncPreat(simulator.start("tcp://127.0.0.1:0"))
+
+    async def session():
+        return await preat.execute_many(commands(8))
+
+    assert asyncio.run(session()) == [Result.NO_ERROR] * 8
+    preat.port.close()
+
+
+def test_writes_are_batched():
+    host, device = socket.socketpair()
+    port = SocketTransport(host)
+    port.write(b"\x01\x02")
+    port.write(b"\x03")
+    device.setblocking(False)
+    with pytest.raises(BlockingIOError):
+        device.recv(16)
+
+    port.timeout = 0
+    assert port.read(1) == b""
+    assert device.recv(16) == b"\x01\x02\x03"
+    device.close()
+    with pytest.raises(SerialException):
+        port.read(1)